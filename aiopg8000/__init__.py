@@ -3,7 +3,9 @@ from .core import (
     Error, OperationalError, IntegrityError, InternalError, NotSupportedError,
     ArrayContentNotHomogenousError, ArrayContentEmptyError,
     ArrayDimensionsNotConsistentError, ArrayContentNotSupportedError, utc,
-    Connection, Cursor, Binary, Date, DateFromTicks, Time, TimeFromTicks,
+    Connection, ConnectionProtocol, Cursor, Pipeline, PreparedStatement,
+    BatchIterator, CopyOutIterator, Record, tuple_row, namedtuple_row,
+    dict_row, record_row, Binary, Date, DateFromTicks, Time, TimeFromTicks,
     Timestamp, TimestampFromTicks, BINARY, Interval)
 import asyncio
 from ._version import get_versions
@@ -39,8 +41,7 @@ del get_versions
 
 __author__ = "Mathieu Fenniak"
 
-@asyncio.coroutine
-def connect( stream_generator, user=None, database=None, password=None, loop=None, **kwargs):
+async def connect( stream_generator=None, user=None, database=None, password=None, loop=None, transport_generator=None, **kwargs):
     """Creates a connection to a PostgreSQL database.
 
     This function is part of the `DBAPI 2.0 specification
@@ -48,9 +49,10 @@ def connect( stream_generator, user=None, database=None, password=None, loop=Non
     function are not defined by the specification.
 
     :param stream_generator:
-        A function that when called will produce a tuple of
+        A coroutine function that when awaited will produce a tuple of
         ``(asyncio.StreamReader, asyncio.StreamWriter)`` that is connected to
-        the database.
+        the database, such as an ``async def`` function that awaits
+        :func:`asyncio.open_connection`. Either this or ``transport_generator`` must be given.
     :param user:
         The username to connect to the PostgreSQL server with. If this is not
         provided, pg8000 looks first for the PGUSER then the USER environment
@@ -79,7 +81,20 @@ def connect( stream_generator, user=None, database=None, password=None, loop=Non
         Specify an asyncio loop; will defeault to ``asyncio.get_event_loop()``
         if not specified.
 
+    :keyword transport_generator:
+        A function that takes a protocol factory, and returns a coroutine that
+        produces a ``(transport, protocol)`` tuple connected to the database,
+        in the same way as :meth:`asyncio.BaseEventLoop.create_connection`.
+        For example::
 
+            functools.partial(
+                loop.create_connection, host='localhost', port=5432)
+
+        The connection is then driven by a :class:`ConnectionProtocol`, which
+        avoids the overhead of the ``StreamReader`` and ``StreamWriter``. This
+        is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
 
     :rtype:
         A :class:`Connection` object.
@@ -88,7 +103,9 @@ def connect( stream_generator, user=None, database=None, password=None, loop=Non
     if loop is None:
         loop = asyncio.get_event_loop()
     
-    yield from conn.initialize(stream_generator, user, database, password, loop)
+    await conn.initialize(
+        stream_generator, user, database, password, loop,
+        transport_generator=transport_generator)
     return conn
 
 apilevel = "2.0"
@@ -153,7 +170,9 @@ __all__ = [
     ProgrammingError, Error, OperationalError, IntegrityError, InternalError,
     NotSupportedError, ArrayContentNotHomogenousError, ArrayContentEmptyError,
     ArrayDimensionsNotConsistentError, ArrayContentNotSupportedError, utc,
-    Connection, Cursor, Binary, Date, DateFromTicks, Time, TimeFromTicks,
+    Connection, ConnectionProtocol, Cursor, Pipeline, PreparedStatement,
+    BatchIterator, CopyOutIterator, Record, tuple_row, namedtuple_row,
+    dict_row, record_row, Binary, Date, DateFromTicks, Time, TimeFromTicks,
     Timestamp, TimestampFromTicks, BINARY, Interval]
 
 """Version string for aiopg8000.
@@ -3,19 +3,22 @@ from datetime import timedelta
 from warnings import warn
 #import socket
 import threading
-from struct import pack
+from struct import pack, unpack_from, calcsize, error as struct_error
 from hashlib import md5
 from decimal import Decimal
-from collections import deque, defaultdict, namedtuple
+from collections import deque, defaultdict, namedtuple, OrderedDict
 from itertools import count, islice
+from array import array
+from operator import itemgetter
 from .six.moves import map
 from .six import b, PY2, integer_types, next, PRE_26, text_type, u, binary_type
-from sys import exc_info
+from sys import exc_info, byteorder
 from uuid import UUID
 from copy import deepcopy
 from calendar import timegm
 import os
-from distutils.version import LooseVersion
+import re
+from binascii import unhexlify
 from struct import Struct
 import time
 
@@ -66,13 +69,12 @@ def public_coroutine_decorator(func):
     """
     assert asyncio.iscoroutinefunction(func)
     
-    @asyncio.coroutine
     @functools.wraps(func)
-    def replacement(*args, **kwargs):
+    async def replacement(*args, **kwargs):
         self = args[0]
 
         try:
-            return (yield from func(*args, **kwargs))
+            return await func(*args, **kwargs)
         except Error:
             raise
         except:
@@ -80,7 +82,7 @@ def public_coroutine_decorator(func):
 
             if not self.closed:
                 #log.info('closing connection')
-                yield from self.close()
+                await self.close()
                 #log.info('finished closing connection')
             raise
 
@@ -91,6 +93,16 @@ try:
 except ImportError:
     pass  # Can only use JSON with Python 2.6 and above
 
+try:
+    import numpy
+except ImportError:
+    numpy = None  # Cursor.fetch_columns can only make numpy arrays with it
+
+try:
+    current_task = asyncio.current_task
+except AttributeError:
+    current_task = asyncio.Task.current_task  # Python < 3.7
+
 
 class RLockWrapper:
     def __init__(self):
@@ -255,6 +267,8 @@ ihihih_pack, ihihih_unpack = pack_funcs('ihihih')
 ci_pack, ci_unpack = pack_funcs('ci')
 bh_pack, bh_unpack = pack_funcs('bh')
 cccc_pack, cccc_unpack = pack_funcs('cccc')
+I_pack, I_unpack = pack_funcs('I')
+hhHh_pack, hhHh_unpack = pack_funcs('hhHh')
 
 
 Struct('!i')
@@ -825,6 +839,61 @@ def float8_recv(data, offset, length):
     return d_unpack(data, offset)[0]
 
 
+# The binary decoders below are for the types that are normally requested in
+# text. They're only used for a binary COPY, which sends every column in
+# binary.
+
+def oid_recv(data, offset, length):
+    return I_unpack(data, offset)[0]
+
+
+EPOCH_DATE = EPOCH.date()
+
+
+def date_recv(data, offset, length):
+    days = i_unpack(data, offset)[0]
+    try:
+        return EPOCH_DATE + timedelta(days)
+    except OverflowError:
+        return datetime.date.max if days > 0 else datetime.date.min
+
+
+def time_recv(data, offset, length):
+    hours, micros = divmod(q_unpack(data, offset)[0], 3600000000)
+    minutes, micros = divmod(micros, 60000000)
+    seconds, micros = divmod(micros, 1000000)
+    return datetime.time(hours, minutes, seconds, micros)
+
+
+NUMERIC_NEG = 0x4000
+NUMERIC_SPECIALS = {
+    0xC000: Decimal('NaN'),
+    0xD000: Decimal('Infinity'),
+    0xF000: Decimal('-Infinity'),
+}
+
+
+# Int16 - The number of base 10000 digits.
+# Int16 - The weight of the first digit, in powers of 10000.
+# Int16 - The sign, or one of the special values.
+# Int16 - The number of decimal places.
+# Int16[] - The digits.
+def numeric_recv(data, offset, length):
+    ndigits, weight, sign, dscale = hhHh_unpack(data, offset)
+    if sign > NUMERIC_NEG:
+        return NUMERIC_SPECIALS[sign]
+    value = 0
+    for digit in unpack_from('!' + 'h' * ndigits, data, offset + 8):
+        value = value * 10000 + digit
+    shift = (weight + 1 - ndigits) * 4 + dscale
+    if shift >= 0:
+        value *= 10 ** shift
+    else:
+        value //= 10 ** -shift
+    return Decimal(
+        (sign == NUMERIC_NEG, tuple(int(c) for c in str(value)), -dscale))
+
+
 def bytea_send(v):
     return v
 
@@ -834,7 +903,7 @@ if PY2:
         return Bytea(data[offset:offset + length])
 else:
     def bytea_recv(data, offset, length):
-        return data[offset:offset + length]
+        return bytes(data[offset:offset + length])
 
 
 def uuid_send(v):
@@ -842,7 +911,7 @@ def uuid_send(v):
 
 
 def uuid_recv(data, offset, length):
-    return UUID(bytes=data[offset:offset+length])
+    return UUID(bytes=bytes(data[offset:offset+length]))
 
 
 TRUE = b("\x01")
@@ -855,6 +924,84 @@ def bool_send(v):
 
 NULL = i_pack(-1)
 
+# The struct format codes of the parameter encoders that always produce the
+# same number of bytes, as used for the precompiled Bind templates. Each code
+# has to reject a value of the wrong type, so that the general case gets to
+# deal with it, which rules out '?' for bool_send, as it packs anything.
+FIXED_WIDTH_SEND_FORMATS = {
+    h_pack: 'h',
+    i_pack: 'i',
+    q_pack: 'q',
+    f_pack: 'f',
+    d_pack: 'd',
+}
+
+# The struct format codes of the result decoders for binary values that are
+# always the same number of bytes, as used for the generated row decoders.
+FIXED_WIDTH_RECV_FORMATS = {
+    int2_recv: 'h',
+    int4_recv: 'i',
+    int8_recv: 'q',
+    float4_recv: 'f',
+    float8_recv: 'd',
+}
+
+
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def timestamp_micros(value):
+    # The inverse of the integer timestamp decoders, microseconds since
+    # 2000-01-01, with infinity and -infinity as the server sends them.
+    if value.tzinfo is None:
+        epoch, maximum, minimum = \
+            EPOCH, datetime.datetime.max, datetime.datetime.min
+    else:
+        epoch, maximum, minimum = EPOCH_TZ, DATETIME_MAX_TZ, DATETIME_MIN_TZ
+    if value == maximum:
+        return INFINITY_MICROSECONDS
+    elif value == minimum:
+        return MINUS_INFINITY_MICROSECONDS
+    return (value - epoch) // ONE_MICROSECOND
+
+
+# For the binary decoders whose values are always the same width, the
+# array.array type code and item size that Cursor.fetch_columns reads the
+# values of a column into, and the function that turns a decoded value into
+# an item.
+FIXED_WIDTH_COLUMN_FORMATS = {
+    int2_recv: ('h', 2, None),
+    int4_recv: ('i', 4, None),
+    int8_recv: ('q', 8, None),
+    float4_recv: ('f', 4, None),
+    float8_recv: ('d', 8, None),
+    timestamp_recv_integer: ('q', 8, timestamp_micros),
+    timestamptz_recv_integer: ('q', 8, timestamp_micros),
+}
+
+
+def decode_columns(data, idx, row, funcs):
+    # Decodes the columns of a DataRow one at a time, starting at idx, and
+    # returns the index of the next column.
+    for func in funcs:
+        vlen = i_unpack(data, idx)[0]
+        idx += 4
+        if vlen == -1:
+            row.append(None)
+        else:
+            row.append(func(data, idx, vlen))
+            idx += vlen
+    return idx
+
+
+def bytes_decoder(func):
+    # A decoder that's been added to pg_types from outside the driver gets
+    # its value as bytes of its own, as the row it's in may be a bytearray,
+    # or a memoryview of the read buffer.
+    def decode(data, offset, length):
+        return func(bytes(data[offset:offset + length]), 0, length)
+    return decode
+
 NULL_BYTE = b('\x00')
 
 
@@ -866,6 +1013,402 @@ def int_in(data, offset, length):
     return int(data[offset: offset + length])
 
 
+# The text format decoders below are for the types that are normally
+# requested in binary. Results come back in text the first time a statement
+# is executed, as the column types aren't known when the Bind is sent.
+
+def bool_in(data, offset, length):
+    return data[offset:offset + 1] == b("t")
+
+
+def float8_in(data, offset, length):
+    return float(data[offset: offset + length])
+
+
+# Round to single precision, so the value is the same as a binary float4.
+def float4_in(data, offset, length):
+    return f_unpack(f_pack(float(data[offset: offset + length])))[0]
+
+
+def uuid_in(data, offset, length):
+    return UUID(str(data[offset: offset + length], 'ascii'))
+
+
+BYTEA_ESCAPE = re.compile(b(r"\\([0-7]{3}|\\)"))
+
+
+def bytea_unescape(match):
+    code = match.group(1)
+    if code == b("\\"):
+        return code
+    return pack("!B", int(code, 8))
+
+
+def bytea_in(data, offset, length):
+    if data[offset:offset + 2] == b("\\x"):
+        return Binary(unhexlify(data[offset + 2:offset + length]))
+    else:
+        return Binary(BYTEA_ESCAPE.sub(
+            bytea_unescape, data[offset: offset + length]))
+
+
+def timestamp_in(data, offset, length):
+    s = str(data[offset: offset + length], 'ascii')
+    if s == 'infinity':
+        return datetime.datetime.max
+    elif s == '-infinity':
+        return datetime.datetime.min
+    return parse_timestamp(s)
+
+
+def timestamptz_in(data, offset, length):
+    s = str(data[offset: offset + length], 'ascii')
+    if s == 'infinity':
+        return DATETIME_MAX_TZ
+    elif s == '-infinity':
+        return DATETIME_MIN_TZ
+
+    # The UTC offset is the last +/- in the value, eg. +05:30 or -08, which
+    # comes before the BC of a BC timestamp.
+    end = len(s) - 3 if s.endswith(' BC') else len(s)
+    idx = max(s.rfind('+', 0, end), s.rfind('-', 0, end))
+    sign = -1 if s[idx] == '-' else 1
+    tz_fields = s[idx + 1:end].split(':') + ['0', '0']
+    tz_offset = timedelta(
+        hours=int(tz_fields[0]), minutes=int(tz_fields[1]),
+        seconds=int(tz_fields[2]))
+    return (parse_timestamp(s[:idx] + s[end:]) - sign * tz_offset).replace(
+        tzinfo=utc)
+
+
+# Parses the ISO DateStyle, eg. 2001-09-28 01:02:03.456789, where the year
+# may have more than four digits, and a BC timestamp ends with BC. A year
+# that a datetime can't hold raises the same OverflowError as the binary
+# decoders.
+def parse_timestamp(s):
+    bc = s.endswith(' BC')
+    date_str, time_str = (s[:-3] if bc else s).split(' ')
+    idx = date_str.index('-')
+    year = int(date_str[:idx])
+    if bc:
+        year = 1 - year
+    if not datetime.MINYEAR <= year <= datetime.MAXYEAR:
+        raise OverflowError("date value out of range")
+    if len(time_str) > 8:
+        micros = int(time_str[9:15].ljust(6, '0'))
+    else:
+        micros = 0
+    return datetime.datetime(
+        year, int(date_str[idx + 1:idx + 3]), int(date_str[idx + 4:idx + 6]),
+        int(time_str[0:2]), int(time_str[3:5]), int(time_str[6:8]), micros)
+
+
+INTERVAL_MONTHS = {
+    'year': 12, 'years': 12, 'mon': 1, 'mons': 1}
+
+
+# Parses the postgres IntervalStyle, eg. 1 year 2 mons -3 days +04:05:06.7
+def interval_in(data, offset, length):
+    fields = str(data[offset: offset + length], 'ascii').split()
+    microseconds = days = months = 0
+    idx = 0
+    while idx < len(fields):
+        field = fields[idx]
+        if ':' in field:
+            sign = -1 if field[0] == '-' else 1
+            hours, minutes, seconds = field.lstrip('+-').split(':')
+            secs, _, frac = seconds.partition('.')
+            microseconds = sign * (
+                (int(hours) * 3600 + int(minutes) * 60 + int(secs)) *
+                1000000 + int(frac.ljust(6, '0')))
+            idx += 1
+        else:
+            value, unit = int(field), fields[idx + 1]
+            if unit in ('day', 'days'):
+                days += value
+            else:
+                months += value * INTERVAL_MONTHS[unit]
+            idx += 2
+
+    if months == 0:
+        return datetime.timedelta(days, 0, microseconds)
+    else:
+        return Interval(microseconds, days, months)
+
+
+ARRAY_START = b("{")
+ARRAY_END = b("}")
+ARRAY_QUOTE = b('"')
+ARRAY_ESCAPE = b("\\")
+ARRAY_DELIMITERS = (b(","), ARRAY_END)
+ARRAY_NULL = b("NULL")
+
+
+def array_text_in(elem_func):
+    def array_in(data, offset, length):
+        end = offset + length
+        idx = offset
+
+        # Arrays that don't start at index 1 have their bounds as a prefix,
+        # eg. [0:1]={1,2}
+        if data[idx:idx + 1] != ARRAY_START:
+            idx = bytes(data[idx:end]).find(b("=")) + idx + 1
+
+        stack = []
+        current = None
+        while idx < end:
+            c = data[idx:idx + 1]
+            if c == ARRAY_START:
+                arr = []
+                if current is not None:
+                    current.append(arr)
+                    stack.append(current)
+                current = arr
+                idx += 1
+            elif c == ARRAY_END:
+                if len(stack) > 0:
+                    current = stack.pop()
+                idx += 1
+            elif c in ARRAY_DELIMITERS:
+                idx += 1
+            elif c == ARRAY_QUOTE:
+                idx += 1
+                piece = bytearray()
+                while True:
+                    c = data[idx:idx + 1]
+                    if c == ARRAY_ESCAPE:
+                        piece.extend(data[idx + 1:idx + 2])
+                        idx += 2
+                    elif c == ARRAY_QUOTE:
+                        idx += 1
+                        break
+                    else:
+                        piece.extend(c)
+                        idx += 1
+                piece = bytes(piece)
+                current.append(elem_func(piece, 0, len(piece)))
+            else:
+                stop = idx
+                while data[stop:stop + 1] not in ARRAY_DELIMITERS:
+                    stop += 1
+                if data[idx:stop] == ARRAY_NULL:
+                    current.append(None)
+                else:
+                    current.append(elem_func(data, idx, stop - idx))
+                idx = stop
+        return current
+    return array_in
+
+
+def tuple_row(cursor):
+    """A row factory that makes each row a tuple. Row factories are set with
+    :attr:`Cursor.row_factory` or :attr:`Connection.row_factory`.
+
+    .. versionadded:: 1.11.0
+    """
+    return tuple
+
+
+def namedtuple_row(cursor):
+    """A row factory that makes each row a :func:`~collections.namedtuple`,
+    with a field for each column. Column names that aren't valid field names
+    are replaced with the position of the column, as with ``rename=True``.
+
+    .. versionadded:: 1.11.0
+    """
+    return namedtuple('Row', cursor._column_names(), rename=True)._make
+
+
+def dict_row(cursor):
+    """A row factory that makes each row a dict, keyed by column name.
+
+    .. versionadded:: 1.11.0
+    """
+    names = cursor._column_names()
+
+    def make_row(values):
+        return dict(zip(names, values))
+    return make_row
+
+
+class Record(tuple):
+    """The rows made by the :func:`record_row` row factory. A record is a
+    tuple, with the values also reachable by column name, either as an
+    attribute or as a key. Each row description gets a subclass of its own,
+    so a record holds nothing but its values.
+
+    .. versionadded:: 1.11.0
+    """
+
+    __slots__ = ()
+
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def _asdict(self):
+        return OrderedDict(zip(self._fields, self))
+
+    def __repr__(self):
+        return 'Record(' + ', '.join(
+            name + '=' + repr(value)
+            for name, value in zip(self._fields, self)) + ')'
+
+
+def record_row(cursor):
+    """A row factory that makes each row a :class:`Record`.
+
+    .. versionadded:: 1.11.0
+    """
+    names = cursor._column_names()
+    namespace = {
+        '__slots__': (), '_fields': tuple(names),
+        '_index': dict((name, i) for i, name in enumerate(names))}
+    for i, name in enumerate(names):
+        if name.isidentifier() and not name.startswith('_') and \
+                not hasattr(Record, name) and name not in namespace:
+            namespace[name] = property(itemgetter(i))
+    return functools.partial(
+        tuple.__new__, type('Record', (Record,), namespace))
+
+
+def _binary_array(typecode, data):
+    # Makes an array.array of the big endian items of a binary column.
+    column = array(typecode, data)
+    if byteorder == 'little':
+        column.byteswap()
+    return column
+
+
+def _copy_binary_columns(raw_rows, funcs, formats, columns):
+    # Adds binary DataRows to the columns for Cursor.fetch_columns. The
+    # values of the fixed width columns are copied as they are, and only
+    # those of the other columns are decoded. If every row has the same
+    # layout, the bytes of a column are at the same offset in each one, and
+    # are copied a column at a time.
+    if None not in formats:
+        row_size = 2 + sum(4 + fmt[1] for fmt in formats)
+        raw = b''.join(raw_rows)
+        if len(raw) == len(raw_rows) * row_size:
+            offset = 2
+            for (values, nulls), (typecode, width, convert) in zip(
+                    columns, formats):
+                offset += 4
+                column = bytearray(len(raw_rows) * width)
+                for j in range(width):
+                    column[j::width] = raw[offset + j::row_size]
+                offset += width
+                values.extend(_binary_array(typecode, column))
+                nulls.extend(bytes(len(raw_rows)))
+            return
+
+    # Otherwise each run of fixed width columns is copied as a block, after
+    # checking that none of its values are NULL with a struct that unpacks
+    # just the lengths. A run with a NULL in it is copied a value at a
+    # time, with zero bytes in place of the NULL, so that the blocks of a
+    # run all have the same layout, and are split into columns at the end.
+    # The values of the other columns are decoded.
+    segments = []
+    i = 0
+    while i < len(formats):
+        if formats[i] is None:
+            segments.append((i, None))
+            i += 1
+            continue
+        j = i
+        while j < len(formats) and formats[j] is not None:
+            j += 1
+        widths = tuple(fmt[1] for fmt in formats[i:j])
+        segments.append((i, (
+            Struct('!' + ''.join('i%dx' % w for w in widths)), widths,
+            sum(4 + w for w in widths), bytearray(), bytearray(),
+            bytes(len(widths)),
+            tuple(i_pack(w) + bytes(w) for w in widths))))
+        i = j
+
+    for data in raw_rows:
+        idx = 2
+        for i, run in segments:
+            if run is None:
+                values, nulls = columns[i]
+                vlen = i_unpack(data, idx)[0]
+                idx += 4
+                if vlen == -1:
+                    values.append(None)
+                    nulls.append(1)
+                else:
+                    values.append(funcs[i](data, idx, vlen))
+                    nulls.append(0)
+                    idx += vlen
+                continue
+
+            lengths, widths, size, block, flags, no_nulls, zeros = run
+            try:
+                whole = lengths.unpack_from(data, idx) == widths
+            except struct_error:
+                whole = False
+            if whole:
+                block.extend(data[idx:idx + size])
+                flags.extend(no_nulls)
+                idx += size
+            else:
+                for k, width in enumerate(widths):
+                    if i_unpack(data, idx)[0] == -1:
+                        block.extend(zeros[k])
+                        flags.append(1)
+                        idx += 4
+                    else:
+                        block.extend(data[idx:idx + 4 + width])
+                        flags.append(0)
+                        idx += 4 + width
+
+    for i, run in segments:
+        if run is None:
+            continue
+        lengths, widths, size, block, flags, no_nulls, zeros = run
+        count = len(block) // size
+        offset = 0
+        for k, width in enumerate(widths):
+            offset += 4
+            column = bytearray(count * width)
+            for m in range(width):
+                column[m::width] = block[offset + m::size]
+            offset += width
+            values, nulls = columns[i + k]
+            values.extend(_binary_array(formats[i + k][0], column))
+            nulls.extend(flags[k::len(widths)])
+
+
+def _decode_columns(rows, formats, columns):
+    # Adds decoded rows to the columns for Cursor.fetch_columns.
+    for i, ((values, nulls), fmt) in enumerate(zip(columns, formats)):
+        column = [row[i] for row in rows]
+        nulls.extend(value is None for value in column)
+        if fmt is None:
+            values.extend(column)
+        elif fmt[2] is None:
+            values.extend(0 if value is None else value for value in column)
+        else:
+            convert = fmt[2]
+            values.extend(
+                0 if value is None else convert(value) for value in column)
+
+
+def _numpy_column(values, convert):
+    # Makes a numpy array of an array.array column for Cursor.fetch_columns.
+    if convert is int:
+        return numpy.frombuffer(values, '?')
+    column = numpy.frombuffer(values, values.typecode)
+    if convert is timestamp_micros:
+        column = column.astype('timedelta64[us]') + \
+            numpy.datetime64('2000-01-01', 'us')
+    return column
+
+
 class Cursor(object):
     """A cursor object is returned by the :meth:`~Connection.cursor` method of
     a connection. It has the following attributes and methods:
@@ -917,14 +1460,92 @@ class Cursor(object):
 
         This attribute is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
+
+    .. attribute:: fetch_size
+
+        The most rows that are fetched from the server at once, while the
+        rows of a query are read with :meth:`fetchone` or :meth:`fetchmany`.
+        It starts out as the :attr:`Connection.fetch_size` of the connection.
+        If it's 0, all the rows are fetched when the query is executed.
+        :meth:`fetchall` always fetches all the remaining rows at once.
+
+        If it's None, the number of rows is chosen as the rows are read. It
+        starts at 100 and doubles with each batch, to cut down on round trips,
+        but only while the rows, at the width of the last batch, take up no
+        more than :attr:`Connection.fetch_buffer_size` bytes.
+
+        A statement without parameters is sent as a simple query, whose rows
+        all arrive at once (see :attr:`Connection.use_simple_query`), unless
+        the cursor's own fetch_size has been set to something other than 0,
+        or :attr:`prefetch` is on. Then it goes through the extended query
+        protocol, so that its rows are fetched in batches, except with
+        autocommit on, when the portal wouldn't outlast the first batch.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: row_factory
+
+        If None, each row is a list of the values of its columns. Otherwise,
+        it's called with the cursor once for each result, and returns a
+        function that makes each row out of such a list. It starts out as the
+        :attr:`Connection.row_factory` of the connection. The row factories
+        :func:`tuple_row`, :func:`namedtuple_row`, :func:`dict_row` and
+        :func:`record_row` are provided. What a row factory returns is kept
+        with the statement, and used again each time that the statement is
+        executed.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: name
+
+        The name of the cursor on the server, if it's a named cursor made by
+        :meth:`Connection.cursor`, otherwise None. A named cursor declares
+        each query as a server side cursor, with ``DECLARE``, and reads its
+        rows :attr:`fetch_size` at a time. If the cursor was made with
+        ``hold=True``, it's declared ``WITH HOLD``, and so lasts beyond the
+        end of the transaction, which lets the rows of a large query be read
+        in batches with autocommit on.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: prefetch
+
+        If True, the next batch of rows is fetched in the background while
+        the rows of the current one are read with :meth:`fetchone` or
+        :meth:`fetchmany`. The fetch is started once fewer than half a
+        batch of rows are left, so that a stream of rows costs about one
+        round trip of waiting, rather than one for every batch. The other
+        methods of the connection wait for a fetch that's under way to finish
+        before they go to the server. Defaults to False.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
     """
 
-    def __init__(self, connection):
+    def __init__(self, connection, name=None, hold=False):
         self._c = connection
+        self.name = name
+        self.hold = hold
         self.arraysize = 1
+        self.row_factory = connection.row_factory
+        self._fetch_size = connection.fetch_size
+        # Whether fetch_size has been set on the cursor, to something other
+        # than 0.
+        self._fetch_size_set = False
+        self._adaptive_fetch_size = connection._initial_fetch_size
+        self.prefetch = False
+        self._prefetch_error = None
         self.ps = None
         self._row_count = -1
         self._cached_rows = deque()
+        self._decode_row = None
         self.portal_name = None
         self.portal_suspended = False
 
@@ -937,40 +1558,76 @@ class Cursor(object):
     def rowcount(self):
         return self._row_count
 
+    @property
+    def fetch_size(self):
+        return self._fetch_size
+
+    @fetch_size.setter
+    def fetch_size(self, fetch_size):
+        self._fetch_size = fetch_size
+        self._fetch_size_set = fetch_size != 0
+
     description = property(lambda self: self._getDescription())
 
     ColumnDescription = namedtuple('ColumnDescription', ['name', 'type_code', 'display_size'
                                                         , 'internal_size', 'precision', 'scale', 'null_ok'])
 
     def _getDescription(self):
+        # The description is made once for each row description, and kept
+        # with the statement.
         if self.ps is None:
             return None
         row_desc = self.ps['row_desc']
         if len(row_desc) == 0:
             return None
-        columns = []
-        for col in row_desc:
-            columns.append(
-                Cursor.ColumnDescription(col["name"], col["type_oid"], None, None, None, None, None))
-        return columns
+        try:
+            desc, description = self.ps['description']
+            if desc is row_desc:
+                return description
+        except KeyError:
+            pass
+        description = tuple(
+            Cursor.ColumnDescription(
+                col["name"], col["type_oid"], None, None, None, None, None)
+            for col in row_desc)
+        self.ps['description'] = row_desc, description
+        return description
+
+    def _column_names(self):
+        encoding = self._c._client_encoding
+        return [str(col[0], encoding) for col in self._getDescription()]
+
+    def _row_maker(self):
+        # Returns the function that the row factory made for the current
+        # result, which is kept with the statement for as long as its row
+        # description stays the same.
+        factory = self.row_factory
+        makers = self.ps.setdefault('row_makers', {})
+        try:
+            desc, make_row = makers[factory]
+            if desc is self.ps['row_desc']:
+                return make_row
+        except KeyError:
+            pass
+        make_row = factory(self)
+        makers[factory] = self.ps['row_desc'], make_row
+        return make_row
 
     @property
     def closed(self):
         return self._c is None
-    @asyncio.coroutine
-    def _check_sane(self):
+    async def _check_sane(self):
         if self.closed:
             raise InterfaceError("Cursor closed")
         elif self._c.closed:
             raise InterfaceError("connection is closed")
-        yield from self._c._check_sane()
+        await self._c._check_sane()
     ##
     # Executes a database operation.  Parameters may be provided as a sequence
     # or mapping and will be bound to variables in the operation.
     # <p>
     # Stability: Part of the DBAPI 2.0 specification.
-    @asyncio.coroutine
-    def execute(self, operation, args=None, stream=None):
+    async def execute(self, operation, args=None, stream=None):
         """Coroutine. Executes a database operation.  Parameters may be provided as a
         sequence, or as a mapping, depending upon the value of
         :data:`pg8000.paramstyle`.
@@ -999,13 +1656,16 @@ class Cursor(object):
         """
         try:
             self._c._lock.acquire()
-            yield from self._check_sane()
+            await self._check_sane()
 
             self.stream = stream
 
             if not self._c.in_transaction and not self._c.autocommit:
-                yield from self._c.execute(self, "begin transaction", None)
-            yield from self._c.execute(self, operation, args)
+                await self._c.execute(self, "begin transaction", None)
+            if self.name is None:
+                await self._c.execute(self, operation, args)
+            else:
+                await self._c.declare(self, operation, args)
         except AttributeError:
             if self._c is None:
                 raise InterfaceError("Cursor closed")
@@ -1016,8 +1676,7 @@ class Cursor(object):
         finally:
             self._c._lock.release()
 
-    @asyncio.coroutine
-    def mogrify(self,formatsql,params):
+    async def mogrify(self,formatsql,params):
         """Coroutine. Format an sql statement, and return the resulting formated sql statement.
         Uses pyformat exclusively, in the spirit of psycopg2, except that it only allows
         dictionary/named parameters. Will throw a ProgrammingError if there is a formatting error. 
@@ -1027,14 +1686,20 @@ class Cursor(object):
         except FormatException as e:
             raise ProgrammingError('Error formatting sql', formatsql, params) from e
 
-    @asyncio.coroutine
-    def executemany(self, operation, param_sets):
+    async def executemany(self, operation, param_sets):
         """Coroutine. Prepare a database operation, and then execute it against all
         parameter sequences or mappings provided.
 
         This method is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
 
+        The parameter sets are sent to the server in batches, without waiting
+        for the result of each one, and with a single round trip per batch.
+        If one of the parameter sets fails, the error is raised and the rest
+        of its batch isn't executed. With autocommit on, each batch runs in a
+        transaction of its own, so none of the failed batch takes effect but
+        the batches before it have been committed.
+
         :param operation:
             The SQL statement to execute
         :param parameter_sets:
@@ -1042,16 +1707,29 @@ class Cursor(object):
             in the sequence should be sequences or mappings of parameters, the
             same as the args argument of the :meth:`execute` method.
         """
-        yield from self._check_sane()
-        rowcounts = []
-        for parameters in param_sets:
-            yield from self.execute(operation, parameters)
-            rowcounts.append(self._row_count)
+        try:
+            self._c._lock.acquire()
+            await self._check_sane()
+
+            self.stream = None
+            if self.name is not None:
+                raise ProgrammingError(
+                    "a named cursor can't be used with executemany()")
 
-        self._row_count = -1 if -1 in rowcounts else sum(rowcounts)
+            if not self._c.in_transaction and not self._c.autocommit:
+                await self._c.execute(self, "begin transaction", None)
+            await self._c.executemany(self, operation, param_sets)
+        except AttributeError:
+            if self._c is None:
+                raise InterfaceError("Cursor closed")
+            elif self._c.closed:
+                raise InterfaceError("connection is closed")
+            else:
+                raise exc_info()[1]
+        finally:
+            self._c._lock.release()
 
-    @asyncio.coroutine
-    def fetchone(self):
+    async def fetchone(self):
         """Coroutine. Fetch the next row of a query result set.
 
         This method is part of the `DBAPI 2.0 specification
@@ -1061,9 +1739,9 @@ class Cursor(object):
             A row as a sequence of field values, or ``None`` if no more rows
             are available.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         try:
-            return (yield from self.get_next_row())
+            return await self.get_next_row()
         except StopIteration:
             return None
         except TypeError:
@@ -1071,8 +1749,7 @@ class Cursor(object):
         except AttributeError:
             raise ProgrammingError("attempting to use unexecuted cursor")
 
-    @asyncio.coroutine
-    def fetchmany(self, num=None):
+    async def fetchmany(self, num=None):
         """Coroutine. Fetches the next set of rows of a query result.
 
         This method is part of the `DBAPI 2.0 specification
@@ -1089,27 +1766,18 @@ class Cursor(object):
             making up a row.  If no more rows are available, an empty sequence
             will be returned.
         """
-        yield from self._check_sane()
-
         num = num if num is not None else self.arraysize
         try:
-            result = []
-            while True:
-                row = yield from self.get_next_row()
-                if row is None:
-                    break
-                result.append(row)
-
-                if len(result) == num:
-                    break
-            return tuple(result)
+            return await self._get_rows(num)
         except TypeError:
             raise ProgrammingError("attempting to use unexecuted cursor")
 
-    @asyncio.coroutine
-    def fetchall(self):
+    async def fetchall(self):
         """Coroutine. Fetches all remaining rows of a query result.
 
+        Rather than being fetched :attr:`fetch_size` rows at a time, the
+        rows that are still on the server are all fetched in one round trip.
+
         This method is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
 
@@ -1118,27 +1786,115 @@ class Cursor(object):
             A sequence, each entry of which is a sequence of field values
             making up a row.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         try:
-            result = []
-            while True:
-                row = yield from self.get_next_row()
-                if row is None:
-                    break
-                result.append(row)
-            return tuple(result)
-        except TypeError:
-            raise ProgrammingError("attempting to use unexecuted cursor")
+            self._c._lock.acquire()
+            await self._join_prefetch()
+            if self.portal_suspended:
+                await self._c.poll_rows(self, 0)
+
+            if self.ps is None:
+                raise ProgrammingError("A query hasn't been issued.")
+            elif len(self._cached_rows) == 0 and \
+                    len(self.ps['row_desc']) == 0:
+                raise ProgrammingError("no result set")
+            if self.row_factory is None:
+                result = tuple(self._cached_rows)
+            else:
+                result = tuple(map(self._row_maker(), self._cached_rows))
+            self._cached_rows.clear()
+            return result
+        finally:
+            self._c._lock.release()
+
+    async def fetch_columns(self, as_numpy=False):
+        """Coroutine. Fetches all remaining rows of a query result, as
+        columns. The values of ``int2``, ``int4``, ``int8``, ``float4``,
+        ``float8``, ``bool``, ``timestamp`` and ``timestamptz`` columns are
+        put in an :class:`array.array`, where a timestamp is the number of
+        microseconds since 2000-01-01, infinity and -infinity are the largest
+        and smallest 64 bit integers, and a NULL is 0. The values of the
+        other columns are put in a list. Once a statement has been executed
+        before, and its rows come in binary, the values of these types in the
+        rows that are fetched here are copied into the arrays without
+        decoding them. The first time a statement is executed, its rows come
+        in text, and every value is decoded.
+
+        This method is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+        :param as_numpy:
+            If True, the arrays are :mod:`numpy` arrays instead, with the
+            timestamps as ``datetime64[us]`` values and the bools as
+            ``bool`` values. numpy has to be installed.
+
+        :returns:
+            A tuple with an entry for each column, which is a pair of the
+            values and an array that is 1 (or True) for each value that's
+            NULL.
+        """
+        if as_numpy and numpy is None:
+            raise InterfaceError("numpy isn't installed")
+        await self._check_sane()
+        try:
+            self._c._lock.acquire()
+            await self._join_prefetch()
+            if self.ps is None:
+                raise ProgrammingError("A query hasn't been issued.")
+            rows = self._cached_rows
+            decode_row = self._decode_row
+            binary = False
+            raw_rows = ()
+            if self.portal_suspended:
+                # The rows that are left are kept as they come, and only the
+                # values of the columns that aren't of a fixed width are
+                # decoded, unless the rows are in text.
+                binary = decode_row is self.ps.get('row_decoder')
+                fetched = len(rows)
+                self._decode_row = bytes
+                try:
+                    await self._c.poll_rows(self, 0)
+                finally:
+                    self._decode_row = decode_row
+                raw_rows = [rows.pop() for i in range(len(rows) - fetched)]
+                raw_rows.reverse()
+            row_desc = self.ps['row_desc']
+            if len(row_desc) == 0:
+                raise ProgrammingError("no result set")
+
+            formats = tuple(
+                self._c.pg_column_formats.get(f['func']) for f in row_desc)
+            columns = tuple(
+                ([] if fmt is None else array(fmt[0]), array('B'))
+                for fmt in formats)
+            _decode_columns(rows, formats, columns)
+            rows.clear()
+            if binary:
+                _copy_binary_columns(
+                    raw_rows, tuple(f['func'] for f in row_desc), formats,
+                    columns)
+            else:
+                _decode_columns(
+                    list(map(decode_row, raw_rows)), formats, columns)
+
+            if as_numpy:
+                columns = tuple(
+                    (values if fmt is None else
+                     _numpy_column(values, fmt[2]),
+                     numpy.frombuffer(nulls, '?'))
+                    for (values, nulls), fmt in zip(columns, formats))
+            return columns
+        finally:
+            self._c._lock.release()
 
-    @asyncio.coroutine
-    def yield_close(self):
+    async def yield_close(self):
         """Coroutine. Closes the cursor.
 
         This method is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        self._c = None
-        #TODO: reset all the cached return rows
+        self.close()
 
     def close(self):
         """Closes the cursor.
@@ -1146,20 +1902,72 @@ class Cursor(object):
         This method is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
+        # A prefetch for the cursor that's under way closes the portal itself
+        # once it's done.
+        if self._c is not None and self.portal_suspended and \
+                self._c._prefetch_cursor is not self:
+            self._c.close_portal(self)
         self._c = None
         #TODO: reset all the cached return rows
-        
-    
-    
-    
-    '''
-    def __iter__(self):
-        """A cursor object is iterable to retrieve the rows from a query.
+
+    def __aiter__(self):
+        """A cursor object is asynchronously iterable, with ``async for``,
+        to retrieve the rows from a query. The rows are fetched from the
+        server :attr:`fetch_size` at a time, as they're needed.
 
         This is a DBAPI 2.0 extension.
         """
         return self
-    '''
+
+    async def __anext__(self):
+        row = await self.fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    def iter_batches(self, size=None):
+        """Returns an asynchronous iterator over the rows of a query result,
+        a sequence of rows at a time, for use with ``async for``. Only the
+        rows of one batch from the server are held at once, rather than the
+        whole result as with :meth:`fetchall`.
+
+        This function is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+        :param size:
+            The number of rows in each sequence, apart from the last, which
+            may have fewer. If None, each sequence is the rows that came from
+            the server in one batch of :attr:`fetch_size` rows.
+        """
+        return BatchIterator(self, size)
+
+    def copy_out_records(self, query, batch_size=1000):
+        """Returns an asynchronous iterator over the rows of a query, a
+        sequence of rows at a time, for use with ``async for``. The rows are
+        fetched with a ``COPY (query) TO STDOUT`` in the binary format, which
+        is the quickest way of getting a large result, such as a whole table,
+        from the server. Only the rows of the current batch are held at once,
+        unless something else is sent on the connection before the iterator
+        is finished, in which case the rest of the rows are read first.
+
+        Every column has to be of a type that can be decoded in binary, or
+        else :exc:`NotSupportedError` is raised. The :attr:`description` and
+        :attr:`rowcount` of the cursor are set for the query, and the
+        :attr:`row_factory` of the cursor is applied to each row.
+
+        This function is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+        :param query:
+            A query that returns rows, without any parameters.
+
+        :param batch_size:
+            The number of rows in each sequence, apart from the last, which
+            may have fewer.
+        """
+        return CopyOutIterator(self, query, batch_size)
 
     def setinputsizes(self, sizes):
         """This method is part of the `DBAPI 2.0 specification
@@ -1175,31 +1983,79 @@ class Cursor(object):
         """
         pass
 
-    @asyncio.coroutine
-    def poll_rows(self):
-        yield from self._check_sane()
-
-        yield from self._c.poll_rows(self)
-    @asyncio.coroutine
-    def get_next_row(self):
-        yield from self._check_sane()
+    async def poll_rows(self):
+        await self._check_sane()
+
+        await self._c.poll_rows(self)
+
+    async def _join_prefetch(self):
+        # Waits for a prefetch that's under way, and raises the error that a
+        # prefetch for this cursor ran into, if there was one.
+        await self._c._join_prefetch()
+        error = self._prefetch_error
+        if error is not None:
+            self._prefetch_error = None
+            raise error
+
+    async def _fill_cache(self):
+        # Makes sure that there are rows in the cache, fetching the next
+        # batch from the server if need be. Returns False if there are no
+        # rows left.
+        if len(self._cached_rows) == 0:
+            await self._join_prefetch()
+            if len(self._cached_rows) == 0:
+                await self.poll_rows()
+                if len(self._cached_rows) == 0:
+                    if self.ps is None:
+                        raise ProgrammingError("A query hasn't been issued.")
+                    elif len(self.ps['row_desc']) == 0:
+                        raise ProgrammingError("no result set")
+                    return False
+        return True
+
+    def _check_prefetch(self):
+        if self.prefetch and self.portal_suspended and \
+                len(self._cached_rows) < \
+                (self.fetch_size or self._adaptive_fetch_size) // 2:
+            self._c._start_prefetch(self)
+
+    async def get_next_row(self):
+        await self._check_sane()
 
         try:
             self._c._lock.acquire()
+            if not await self._fill_cache():
+                return None
+            row = self._cached_rows.popleft()
+            self._check_prefetch()
+            if self.row_factory is not None:
+                row = self._row_maker()(row)
+            return row
+        finally:
+            self._c._lock.release()
 
-            return self._cached_rows.popleft()
-        except IndexError:
-            yield from self.poll_rows()
+    async def _get_rows(self, num):
+        # Returns a tuple of the next num rows, or fewer at the end of the
+        # rows. If num is None, it's the rows of the next batch.
+        await self._check_sane()
 
-            try:
-                return self._cached_rows.popleft()
-            except IndexError:
-                if self.ps is None:
-                    raise ProgrammingError("A query hasn't been issued.")
-                elif len(self.ps['row_desc']) == 0:
-                    raise ProgrammingError("no result set")
+        try:
+            self._c._lock.acquire()
+            rows = self._cached_rows
+            result = []
+            while await self._fill_cache():
+                if num is None or len(rows) <= num - len(result):
+                    result.extend(rows)
+                    rows.clear()
                 else:
-                    return None
+                    result.extend(
+                        rows.popleft() for i in range(num - len(result)))
+                self._check_prefetch()
+                if num is None or len(result) == num:
+                    break
+            if self.row_factory is not None and len(result) > 0:
+                return tuple(map(self._row_maker(), result))
+            return tuple(result)
         finally:
             self._c._lock.release()
 
@@ -1209,62 +2065,301 @@ class Cursor(object):
     def __exit__(self,*exc):
         self.close()
         return False
-    
+
+
+class BatchIterator(object):
+    """An asynchronous iterator over the rows of a query result, a sequence
+    of rows at a time. It's returned by :meth:`Cursor.iter_batches`.
+
+    .. versionadded:: 1.11.0
     """
-    def __next__(self):
+
+    def __init__(self, cursor, size):
+        self._cursor = cursor
+        self._size = size
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
         try:
-            self._c._lock.acquire()
-            return self._cached_rows.popleft()
-        except IndexError:
-            if self.portal_suspended:
-                self._c.send_EXECUTE(self)
-                self._c._write(SYNC_MSG)
-                self._c._flush()
-                self._c.handle_messages(self)
-                if not self.portal_suspended:
-                    self._c.close_portal(self)
-            try:
-                return self._cached_rows.popleft()
-            except IndexError:
-                if self.ps is None:
-                    raise ProgrammingError("A query hasn't been issued.")
-                elif len(self.ps['row_desc']) == 0:
-                    raise ProgrammingError("no result set")
-                else:
-                    raise StopIteration()
-        finally:
-            self._c._lock.release()
+            rows = await self._cursor._get_rows(self._size)
+        except TypeError:
+            raise ProgrammingError("attempting to use unexecuted cursor")
+        if len(rows) == 0:
+            raise StopAsyncIteration
+        return rows
 
 
-if PY2:
-    Cursor.next = Cursor.__next__
-"""
+class CopyOutIterator(object):
+    """An asynchronous iterator over the rows of a binary COPY OUT, a
+    sequence of rows at a time. It's returned by
+    :meth:`Cursor.copy_out_records`.
 
-# Message codes
-NOTICE_RESPONSE = b("N")
-AUTHENTICATION_REQUEST = b("R")
-PARAMETER_STATUS = b("S")
-BACKEND_KEY_DATA = b("K")
-READY_FOR_QUERY = b("Z")
-ROW_DESCRIPTION = b("T")
-ERROR_RESPONSE = b("E")
-DATA_ROW = b("D")
-COMMAND_COMPLETE = b("C")
-PARSE_COMPLETE = b("1")
-BIND_COMPLETE = b("2")
-CLOSE_COMPLETE = b("3")
-PORTAL_SUSPENDED = b("s")
-NO_DATA = b("n")
-PARAMETER_DESCRIPTION = b("t")
-NOTIFICATION_RESPONSE = b("A")
-COPY_DONE = b("c")
-COPY_DATA = b("d")
-COPY_IN_RESPONSE = b("G")
-COPY_OUT_RESPONSE = b("H")
-EMPTY_QUERY_RESPONSE = b("I")
+    .. versionadded:: 1.11.0
+    """
 
-QUERY = b('Q')
-BIND = b("B")
+    def __init__(self, cursor, query, batch_size):
+        self._cursor = cursor
+        self._query = query
+        self._batch_size = batch_size
+        self._rows = deque()
+        self._decode_row = None
+        self._make_row = None
+        self._started = False
+        self._finished = False
+        # The first CopyData starts with the header of the COPY.
+        self._header = True
+        self._error = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        cursor = self._cursor
+        await cursor._check_sane()
+        c = cursor._c
+        try:
+            c._lock.acquire()
+            if not self._started:
+                self._started = True
+                if not c.in_transaction and not c.autocommit:
+                    await c.execute(cursor, "begin transaction", None)
+                # If the COPY can't be started, there's nothing to read.
+                self._finished = True
+                await c.copy_out(cursor, self._query, self)
+                self._finished = False
+                if cursor.row_factory is not None:
+                    self._make_row = cursor._row_maker()
+            rows = self._rows
+            if not self._finished and len(rows) < self._batch_size:
+                # The rest of the COPY may have been read while waiting.
+                await c._wait_prefetch()
+                if not self._finished:
+                    await c._read_copy_out(self, self._batch_size)
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            if len(rows) == 0:
+                raise StopAsyncIteration
+            batch = tuple(
+                rows.popleft()
+                for i in range(min(self._batch_size, len(rows))))
+            if self._make_row is not None:
+                return tuple(map(self._make_row, batch))
+            return batch
+        finally:
+            c._lock.release()
+
+
+class Pipeline(object):
+    """A pipeline is returned by the :meth:`~Connection.pipeline` method of a
+    connection. It queues up statements, and then sends them all to the server
+    in a single flight, without waiting for the result of each one in turn.
+    The results are matched up with the statements as they come back.
+
+    Each statement is synchronized on its own, so an error in one statement
+    doesn't stop the others being executed. However, with autocommit off the
+    statements all run in the same transaction, and so an error will abort the
+    statements that come after it.
+
+    A pipeline can be used as an asynchronous context manager, in which case
+    the queued statements are sent when the block is exited::
+
+        async with conn.pipeline() as p:
+            f1 = p.execute("SELECT 1")
+            f2 = p.execute("UPDATE t1 SET f2 = %s", (2,))
+        rows = await f1.result().fetchall()
+
+    This is a pg8000 extension.
+
+    .. versionadded:: 1.11.0
+    """
+
+    def __init__(self, connection):
+        self._c = connection
+        self._queue = []
+
+    def execute(self, operation, args=None):
+        """Queues a database operation, which is sent to the server on the
+        next call to :meth:`sync`.
+
+        :param operation:
+            The SQL statement to execute.
+
+        :param args:
+            The parameters to bind into the statement, as for
+            :meth:`Cursor.execute`.
+
+        :returns:
+            An :class:`asyncio.Future` that is resolved once the statement's
+            results have been read. Its result is a :class:`Cursor` holding
+            all the rows returned by the statement, and its row count.
+        """
+        future = asyncio.Future(loop=self._c.loop)
+        self._queue.append((Cursor(self._c), operation, args, future))
+        return future
+
+    async def sync(self):
+        """Coroutine. Sends all the queued statements to the server, and waits
+        for their results.
+        """
+        queue, self._queue = self._queue, []
+        if len(queue) == 0:
+            return
+
+        try:
+            self._c._lock.acquire()
+            await self._c._execute_pipeline(queue)
+        finally:
+            self._c._lock.release()
+
+    def cancel(self):
+        """Discards the queued statements without sending them. The futures
+        returned by :meth:`execute` are cancelled.
+        """
+        for cursor, operation, args, future in self._queue:
+            future.cancel()
+        del self._queue[:]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.sync()
+        else:
+            self.cancel()
+        return False
+
+
+class PreparedStatement(object):
+    """A prepared statement is returned by the :meth:`~Connection.prepare`
+    method of a connection. The SQL is parsed on the server once, when the
+    statement is prepared. The types of the parameters are decided by the
+    server at that time, and each execution of the statement sends the
+    parameters straight in those types, without looking at the SQL again or
+    inspecting the Python types of the values.
+
+    A parameter value must be of a Python type that suits the type of the
+    parameter, otherwise a :class:`DataError` is raised. For example an
+    ``int4`` parameter needs an :class:`int` in range.
+
+    This class is a pg8000 extension.
+
+    .. versionadded:: 1.11.0
+
+    .. attribute:: operation
+
+        The SQL of the statement, as it was passed to
+        :meth:`~Connection.prepare`.
+    """
+
+    def __init__(self, connection, operation, make_args, ps):
+        self._c = connection
+        self.operation = operation
+        self._make_args = make_args
+        self._cursor = Cursor(connection)
+        self._cursor.ps = ps
+
+    @property
+    def parameter_types(self):
+        """The type oids of the parameters, as decided by the server."""
+        return self._cursor.ps['param_oids']
+
+    @property
+    def description(self):
+        """A description of the result columns, in the same form as
+        :attr:`Cursor.description`.
+        """
+        return self._cursor.description
+
+    async def _check_sane(self):
+        if self._cursor.ps['closed']:
+            raise InterfaceError("prepared statement closed")
+        await self._c._check_sane()
+
+    async def fetch(self, *args, **kwargs):
+        """Coroutine. Executes the statement, and returns all the rows that
+        it produces as a list.
+
+        :param args:
+            The parameter values. For the ``named`` and ``pyformat``
+            paramstyles, they're given as keyword arguments instead.
+        """
+        try:
+            self._c._lock.acquire()
+            await self._check_sane()
+            vals = self._make_args(kwargs if len(kwargs) > 0 else args)
+            await self._c._execute_prepared(self._cursor, (vals,))
+            cursor = self._cursor
+            if cursor.row_factory is None:
+                rows = list(cursor._cached_rows)
+            else:
+                rows = list(map(cursor._row_maker(), cursor._cached_rows))
+            cursor._cached_rows.clear()
+            return rows
+        finally:
+            self._c._lock.release()
+
+    async def executemany(self, param_sets):
+        """Coroutine. Executes the statement once for each of the parameter
+        sets. The executions are sent to the server in batches, in the same
+        way as :meth:`Cursor.executemany`.
+
+        :param param_sets:
+            A sequence of parameter sets, each of which is a sequence, or a
+            mapping for the ``named`` and ``pyformat`` paramstyles.
+
+        :returns:
+            The total number of rows affected.
+        """
+        try:
+            self._c._lock.acquire()
+            await self._check_sane()
+            await self._c._execute_prepared(
+                self._cursor, map(self._make_args, param_sets))
+            self._cursor._cached_rows.clear()
+            return self._cursor._row_count
+        finally:
+            self._c._lock.release()
+
+    def close(self):
+        """Closes the statement on the server. The Close message goes out
+        with the next statement that the connection executes.
+        """
+        ps = self._cursor.ps
+        if not ps['closed']:
+            ps['closed'] = True
+            self._c._deferred_closes.append(
+                STATEMENT + ps['statement_name_bin'])
+
+
+# Message codes
+NOTICE_RESPONSE = b("N")
+AUTHENTICATION_REQUEST = b("R")
+PARAMETER_STATUS = b("S")
+BACKEND_KEY_DATA = b("K")
+READY_FOR_QUERY = b("Z")
+ROW_DESCRIPTION = b("T")
+ERROR_RESPONSE = b("E")
+DATA_ROW = b("D")
+COMMAND_COMPLETE = b("C")
+PARSE_COMPLETE = b("1")
+BIND_COMPLETE = b("2")
+CLOSE_COMPLETE = b("3")
+PORTAL_SUSPENDED = b("s")
+NO_DATA = b("n")
+PARAMETER_DESCRIPTION = b("t")
+NOTIFICATION_RESPONSE = b("A")
+COPY_DONE = b("c")
+COPY_DATA = b("d")
+COPY_IN_RESPONSE = b("G")
+COPY_OUT_RESPONSE = b("H")
+EMPTY_QUERY_RESPONSE = b("I")
+
+QUERY = b('Q')
+BIND = b("B")
 PARSE = b("P")
 EXECUTE = b("E")
 FLUSH = b('H')
@@ -1279,10 +2374,19 @@ SYNC_MSG = SYNC + i_pack(4)
 TERMINATE_MSG = TERMINATE + i_pack(4)
 COPY_DONE_MSG = COPY_DONE + i_pack(4)
 
+# The field count of -1 that ends the tuples of a binary COPY.
+COPY_TRAILER = h_pack(-1)
+
 # DESCRIBE constants
 STATEMENT = b('S')
 PORTAL = b('P')
 
+UNNAMED_PORTAL = NULL_BYTE
+UNNAMED_PORTAL_ALL_ROWS = UNNAMED_PORTAL + i_pack(0)
+
+# Bind result-column format codes, zero codes means all text.
+TEXT_RESULTS = h_pack(0)
+
 # ErrorResponse codes
 RESPONSE_SEVERITY = b("S")  # always present
 RESPONSE_CODE = b("C")  # always present
@@ -1319,10 +2423,101 @@ class MulticastDelegate(object):
     def __isub__(self, delegate):
         self.delegates.remove(delegate)
         return self
-    @asyncio.coroutine
-    def __call__(self, *args, **kwargs):
+
+    async def __call__(self, *args, **kwargs):
+        # A delegate may be a coroutine function or a plain function.
         for d in self.delegates:
-            yield from d(*args, **kwargs)
+            result = d(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class ConnectionProtocol(asyncio.Protocol):
+    """An :class:`asyncio.Protocol` that carries a :class:`Connection`, used
+    when the connection is made with a ``transport_generator``. Incoming data
+    is added straight to the read buffer of the connection, without going
+    through an :class:`asyncio.StreamReader`.
+
+    It stands in for the ``StreamWriter`` of a connection made with a
+    ``stream_generator``, so it has the ``write()``, ``drain()`` and
+    ``close()`` methods that the connection uses.
+
+    This class is a pg8000 extension.
+
+    .. versionadded:: 1.11.0
+    """
+
+    def __init__(self, connection):
+        self._c = connection
+        self.transport = None
+        self._data_waiter = None
+        self._drain_waiter = None
+        self._paused = False
+        self._lost = False
+        self._exception = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self._c._read_buffer.extend(data)
+        self._wake_data_waiter()
+
+    def eof_received(self):
+        self._lost = True
+        self._wake_data_waiter()
+
+    def connection_lost(self, exc):
+        self._lost = True
+        self._exception = exc
+        self._wake_data_waiter()
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        self._drain_waiter = None
+
+    def pause_writing(self):
+        self._paused = True
+
+    def resume_writing(self):
+        self._paused = False
+        if self._drain_waiter is not None and not self._drain_waiter.done():
+            self._drain_waiter.set_result(None)
+        self._drain_waiter = None
+
+    def _wake_data_waiter(self):
+        if self._data_waiter is not None and not self._data_waiter.done():
+            self._data_waiter.set_result(None)
+        self._data_waiter = None
+
+    async def wait_for_data(self):
+        """Coroutine. Waits until more data has been added to the read buffer
+        of the connection.
+        """
+        if self._lost:
+            raise InterfaceError("connection is closed")
+        self._data_waiter = asyncio.Future(loop=self._c.loop)
+        await self._data_waiter
+        if self._lost:
+            raise InterfaceError("connection is closed")
+
+    def write(self, data):
+        self.transport.write(data)
+
+    async def drain(self):
+        """Coroutine. Waits until the transport's write buffer has drained
+        below its high-water mark.
+        """
+        if self._lost:
+            if self._exception is not None:
+                raise self._exception
+            raise ConnectionResetError("Connection lost")
+        if not self._paused:
+            return
+        self._drain_waiter = asyncio.Future(loop=self._c.loop)
+        await self._drain_waiter
+
+    def close(self):
+        self.transport.close()
 
 
 class Connection(object):
@@ -1368,6 +2563,99 @@ class Connection(object):
 
         .. versionadded:: 1.9
 
+    .. attribute:: Connection.use_simple_query
+
+        If True, which is the default, statements that are executed without
+        parameters are sent to the server as a simple query. That takes one
+        message, doesn't create a prepared statement on the server, and allows
+        the SQL to contain several statements separated by semicolons, in which
+        case the rows of the last statement that returns rows are available.
+        The results are all received as text. The rows all arrive at once,
+        rather than being fetched in batches through a portal, so a cursor
+        that's been given a :attr:`Cursor.fetch_size` of its own, or has
+        :attr:`Cursor.prefetch` on, uses the extended query protocol for a
+        statement without parameters, unless autocommit is on. A session
+        whose ``DateStyle`` isn't ISO, or whose ``IntervalStyle`` isn't
+        postgres, doesn't use simple queries, as the timestamps and intervals
+        couldn't be read, and nor does a connection to a server older than
+        PostgreSQL 12, which rounds floats sent as text.
+
+        If False, every statement goes through the extended query protocol.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.statement_cache_size
+
+        The most prepared statements that are kept for reuse, which is 100 by
+        default. When another statement is prepared, the least recently used
+        one is dropped from the cache and closed on the server. The Close
+        message goes out with the next statement that's executed, so it
+        doesn't cost a round trip. The statement is kept open on the server
+        until any cursor that's still fetching rows from it has finished.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.prepare_threshold
+
+        The number of times that a statement has to be executed with
+        :meth:`Cursor.execute` or a :class:`Pipeline` before it's kept as a
+        named prepared statement.
+        Until then it's parsed afresh each time as the unnamed statement, so
+        statements that are only run once or twice don't take up memory on the
+        server. The default of 1 prepares every statement the first time it's
+        executed. Statements executed with :meth:`Cursor.executemany` are
+        always prepared.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.fetch_size
+
+        The :attr:`Cursor.fetch_size` that cursors of the connection start
+        out with, which is 100 by default. Changing it doesn't affect
+        existing cursors.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.fetch_buffer_size
+
+        For cursors with a :attr:`Cursor.fetch_size` of None, the most bytes
+        of rows that are fetched from the server at once. It's 1048576 (1MiB)
+        by default.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.row_factory
+
+        The :attr:`Cursor.row_factory` that new cursors, and new prepared
+        statements, start out with. It's None by default, for rows that are
+        lists.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+    .. attribute:: Connection.bytea_memoryview
+
+        If True, ``bytea`` values are returned as read-only
+        :class:`memoryview` objects rather than :class:`bytes`. Each one
+        points into a copy of the row that it came from, so no further copy
+        of the value is made. The copy of the row is kept for as long as any
+        of its values are. It's False by default.
+
+        This attribute is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
     .. exception:: Connection.Error
                    Connection.Warning
                    Connection.InterfaceError
@@ -1404,8 +2692,24 @@ class Connection(object):
     # default value is 100 rows.  The effect of this parameter is transparent.
     # That is, the library reads more rows when the cache is empty
     # automatically.
-    _row_cache_size = 100
-    _row_cache_size_bin = i_pack(_row_cache_size)
+
+    # The number of parameter sets that executemany() sends to the server
+    # before a Sync, and waiting for the results.
+    _executemany_batch_size = 1000
+
+    # The most bytes that are read from the stream at once. Backend messages
+    # are sliced out of what's been read without going back to the event
+    # loop, until the buffer runs out.
+    _read_chunk_size = 65536
+
+    # DataRows longer than this are decoded over a memoryview of the read
+    # buffer, so the columns aren't copied before being decoded. Shorter ones
+    # are cheaper to copy out in one go.
+    _row_view_size = 4096
+
+    # The number of rows fetched at first by a cursor whose fetch_size is
+    # None, before it's adapted to the width of the rows.
+    _initial_fetch_size = 100
 
     def _getError(self, error):
         warn(
@@ -1417,13 +2721,14 @@ class Connection(object):
         pass
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def initialize(
-            self, stream_generator, user, database, password, loop):
+    async def initialize(
+            self, stream_generator, user, database, password, loop,
+            transport_generator=None):
         self.loop = None
         self.close_future = None
         self._writer = None
         self._reader = None
+        self._protocol = None
         
         self.loop = loop
         self._client_encoding = "utf8"
@@ -1451,23 +2756,83 @@ class Connection(object):
 
         self.password = password
         self.autocommit = False
+        self.use_simple_query = True
+        self.statement_cache_size = 100
+        self.prepare_threshold = 1
+        self.bytea_memoryview = False
+        self.fetch_size = 100
+        self.fetch_buffer_size = 1048576
+        self.row_factory = None
         self._xid = None
 
-        self._caches = defaultdict(lambda: defaultdict(dict))
+        # For each paramstyle, the converted form of each operation and the
+        # prepared statements, in least recently used order.
+        # The executions are counted for statements that haven't reached
+        # the prepare_threshold.
+        self._caches = defaultdict(
+            lambda: {
+                'statement': OrderedDict(), 'ps': OrderedDict(),
+                'executions': OrderedDict()})
         self.statement_number = 0
         self.portal_number = 0
 
+        # Close messages for portals (and statements) that are no longer
+        # needed. Rather than paying a round trip for each one, they're sent
+        # at the front of the next message flight.
+        self._deferred_closes = []
+
+        # The text decoders of timestamps and intervals only read the ISO
+        # DateStyle and the postgres IntervalStyle, which are the defaults.
+        # Servers older than PostgreSQL 12 send floats in text rounded to
+        # fewer digits than they hold, unless extra_float_digits is raised,
+        # which is left to the session. If the session has other styles, or
+        # the server is an older one, a new statement is described before
+        # it's executed, so its results can be requested in binary.
+        self._styles = {
+            b("DateStyle"): b("ISO"), b("IntervalStyle"): b("postgres")}
+        self._exact_float_text = True
+        self._text_styles = True
+
+        # The task fetching the next batch of rows for a cursor that has
+        # prefetch on, while the rows of the current batch are being read,
+        # and that cursor.
+        self._prefetch = self._prefetch_cursor = None
+
+        # The iterator of a binary COPY OUT whose rows are still coming in.
+        self._copy_out = None
+
+        # The read buffer has to exist before the protocol is created, as
+        # data_received adds to it directly.
+        self._read_buffer = bytearray()
+        self._read_position = 0
+
+        # The number of bytes that have been dropped from the front of the
+        # read buffer, so that _read_offset + _read_position is the number of
+        # bytes handled since the connection was made.
+        self._read_offset = 0
 
         self._stream_generator = stream_generator
-
-        (self._reader, self._writer) = yield from self._stream_generator()
+        if transport_generator is not None:
+            if stream_generator is not None:
+                raise ProgrammingError(
+                    "only one of stream_generator or transport_generator may "
+                    "be provided")
+            transport, self._protocol = await transport_generator(
+                lambda: ConnectionProtocol(self))
+            self._writer = self._protocol
+        elif stream_generator is not None:
+            (self._reader, self._writer) = await self._stream_generator()
+        else:
+            raise ProgrammingError(
+                "one of stream_generator or transport_generator must be "
+                "provided")
 
 
 
         """
         try:
             if unix_sock is None and host is not None:
-                self._aiosock = yield from asyncio.open_connection()
+                self._aiosock = await asyncio.open_connection()
                 #self._usock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             elif unix_sock is not None:
                 if not hasattr(socket, "AF_UNIX"):
@@ -1475,7 +2840,7 @@ class Connection(object):
                         "attempt to connect to unix socket on unsupported "
                         "platform")
 
-                self._aiosock = yield from asyncio.open_unix_connection()
+                self._aiosock = await asyncio.open_unix_connection()
                 #self._usock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             else:
                 raise ProgrammingError(
@@ -1512,15 +2877,11 @@ class Connection(object):
             self._usock.close()
             raise InterfaceError("communication error", exc_info()[1])
         """
-        self._flush = self._writer.drain
-
-        @asyncio.coroutine
-        def _yield_read(n):
-            return (yield from self._reader.readexactly(n))
-        self._read = _yield_read
+        # Outgoing messages are built up here, and handed to the writer in one
+        # go by _flush.
+        self._write_buffer = bytearray()
 
-        @asyncio.coroutine
-        def _yield_close_aiostream():
+        async def _yield_close_aiostream():
             self._writer.close()
 
         def _future_close_aiostream():
@@ -1530,12 +2891,6 @@ class Connection(object):
         self._yield_close_aiostream = _yield_close_aiostream
         self._future_close_aiostream = _future_close_aiostream
 
-        @asyncio.coroutine
-        def write(data):
-
-            return self._writer.write(data)
-
-        self._write = write
         self._backend_key_data = None
 
         ##
@@ -1599,8 +2954,8 @@ class Connection(object):
         def array_in(data, idx, length):
             arr = []
             prev_c = None
-            for c in data[idx:idx+length].decode(
-                    self._client_encoding).translate(
+            for c in str(
+                    data[idx:idx+length], self._client_encoding).translate(
                     trans_tab).replace(u('NULL'), u('None')):
                 if c not in ('[', ']', ',', 'N') and prev_c in ('[', ','):
                     arr.extend("Decimal('")
@@ -1644,8 +2999,9 @@ class Connection(object):
             return values
 
         def vector_in(data, idx, length):
-            return eval('[' + data[idx:idx+length].decode(
-                self._client_encoding).replace(' ', ',') + ']')
+            return eval('[' + str(
+                data[idx:idx+length], self._client_encoding).replace(
+                ' ', ',') + ']')
 
         if PY2:
             def text_recv(data, offset, length):
@@ -1675,12 +3031,12 @@ class Connection(object):
             hour = int(data[offset:offset + 2])
             minute = int(data[offset + 3:offset + 5])
             sec = Decimal(
-                data[offset + 6:offset + length].decode(self._client_encoding))
+                str(data[offset + 6:offset + length], self._client_encoding))
             return datetime.time(
                 hour, minute, int(sec), int((sec - int(sec)) * 1000000))
 
         def date_in(data, offset, length):
-            year_str = data[offset:offset + 4].decode(self._client_encoding)
+            year_str = str(data[offset:offset + 4], self._client_encoding)
             if year_str == 'infi':
                 return datetime.date.max
             elif year_str == '-inf':
@@ -1692,7 +3048,24 @@ class Connection(object):
 
         def numeric_in(data, offset, length):
             return Decimal(
-                data[offset: offset + length].decode(self._client_encoding))
+                str(data[offset: offset + length], self._client_encoding))
+
+        # Byte1 - The version of the jsonb format, which is 1.
+        # Byte[n] - The JSON text.
+        def jsonb_recv(data, offset, length):
+            return json_in(data, offset + 1, length - 1)
+
+        # A DataRow is decoded over a memoryview of a copy of the row when
+        # bytea_memoryview is set, so the value can point into that.
+        def bytea_view_recv(data, offset, length):
+            if self.bytea_memoryview:
+                return data[offset:offset + length]
+            return bytea_recv(data, offset, length)
+
+        def bytea_view_in(data, offset, length):
+            if self.bytea_memoryview:
+                return memoryview(bytea_in(data, offset, length))
+            return bytea_in(data, offset, length)
 
         def numeric_out(d):
             return str(d).encode(self._client_encoding)
@@ -1700,7 +3073,7 @@ class Connection(object):
         self.pg_types = defaultdict(
             lambda: (FC_TEXT, text_recv), {
                 16: (FC_BINARY, bool_recv),  # boolean
-                17: (FC_BINARY, bytea_recv),  # bytea
+                17: (FC_BINARY, bytea_view_recv),  # bytea
                 19: (FC_BINARY, text_recv),  # name type
                 20: (FC_BINARY, int8_recv),  # int8
                 21: (FC_BINARY, int2_recv),  # int2
@@ -1739,6 +3112,51 @@ class Connection(object):
                 3802: (FC_TEXT, json_in),  # jsonb
             })
 
+        # Text format decoders for the types that pg_types receives in binary
+        self.pg_text_types = defaultdict(
+            lambda: text_recv, {
+                16: bool_in,  # boolean
+                17: bytea_view_in,  # bytea
+                19: text_recv,  # name type
+                20: int_in,  # int8
+                21: int_in,  # int2
+                23: int_in,  # int4
+                25: text_recv,  # TEXT type
+                700: float4_in,  # float4
+                701: float8_in,  # float8
+                705: text_recv,  # unknown
+                1000: array_text_in(bool_in),  # BOOL[]
+                1003: array_text_in(text_recv),  # NAME[]
+                1005: array_text_in(int_in),  # INT2[]
+                1007: array_text_in(int_in),  # INT4[]
+                1009: array_text_in(text_recv),  # TEXT[]
+                1014: array_text_in(text_recv),  # CHAR[]
+                1015: array_text_in(text_recv),  # VARCHAR[]
+                1016: array_text_in(int_in),  # INT8[]
+                1021: array_text_in(float4_in),  # FLOAT4[]
+                1022: array_text_in(float8_in),  # FLOAT8[]
+                1042: text_recv,  # CHAR type
+                1043: text_recv,  # VARCHAR type
+                1114: timestamp_in,  # timestamp
+                1184: timestamptz_in,  # timestamp w/ tz
+                1186: interval_in,  # interval
+                1263: array_text_in(text_recv),  # cstring[]
+                2275: text_recv,  # cstring
+                2950: uuid_in,  # uuid
+            })
+
+        # Binary decoders for the types that pg_types receives in text, for a
+        # binary COPY, where every column comes in binary.
+        self.pg_copy_types = {
+            26: oid_recv,  # oid
+            28: oid_recv,  # xid
+            114: json_in,  # json
+            1082: date_recv,  # date
+            1083: time_recv,  # time
+            1700: numeric_recv,  # NUMERIC
+            3802: jsonb_recv,  # jsonb
+        }
+
         self.py_types = {
             type(None): (-1, FC_BINARY, null_send),  # null
             bool: (16, FC_BINARY, bool_send),
@@ -1756,6 +3174,35 @@ class Connection(object):
             UUID: (2950, FC_BINARY, uuid_send),  # uuid
         }
 
+        # The struct format codes of the fixed width binary decoders.
+        self.pg_recv_formats = FIXED_WIDTH_RECV_FORMATS.copy()
+        self.pg_recv_formats[bool_recv] = '?'
+        self.pg_column_formats = FIXED_WIDTH_COLUMN_FORMATS.copy()
+        self.pg_column_formats[bool_recv] = ('B', 1, int)
+
+        # Encoders for parameters whose type has been described by the
+        # server, by type oid. There's none for bool, as a parameter sent as
+        # unknown is never a bool, and bool_send would take any str or int,
+        # such as 'false', to be true.
+        self.pg_send_types = {
+            17: (FC_BINARY, bytea_send),  # bytea
+            20: (FC_BINARY, q_pack),  # int8
+            21: (FC_BINARY, h_pack),  # int2
+            23: (FC_BINARY, i_pack),  # int4
+            25: (FC_TEXT, text_out),  # text
+            700: (FC_BINARY, f_pack),  # float4
+            701: (FC_BINARY, d_pack),  # float8
+            1042: (FC_TEXT, text_out),  # char
+            1043: (FC_TEXT, text_out),  # varchar
+            1082: (FC_TEXT, date_out),  # date
+            1083: (FC_TEXT, time_out),  # time
+            1114: (FC_BINARY, timestamp_send_integer),  # timestamp
+            1184: (FC_BINARY, timestamptz_send_integer),  # timestamptz
+            1186: (FC_BINARY, interval_send_integer),  # interval
+            1700: (FC_TEXT, numeric_out),  # numeric
+            2950: (FC_BINARY, uuid_send),  # uuid
+        }
+
         self.inspect_funcs = {
             datetime.datetime: self.inspect_datetime,
             list: self.array_inspect,
@@ -1779,8 +3226,8 @@ class Connection(object):
                 return str(v).encode(self._client_encoding)
 
             def inet_in(data, offset, length):
-                inet_str = data[offset: offset + length].decode(
-                    self._client_encoding)
+                inet_str = str(
+                    data[offset: offset + length], self._client_encoding)
                 if '/' in inet_str:
                     return ip_network(inet_str, False)
                 else:
@@ -1794,9 +3241,9 @@ class Connection(object):
         except ImportError:
             pass
 
+        # Handlers for the messages from the server that are dealt with
+        # without any I/O, so they're plain functions.
         self.message_types = {
-            NOTICE_RESPONSE: self.handle_NOTICE_RESPONSE,
-            AUTHENTICATION_REQUEST: self.handle_AUTHENTICATION_REQUEST,
             PARAMETER_STATUS: self.handle_PARAMETER_STATUS,
             BACKEND_KEY_DATA: self.handle_BACKEND_KEY_DATA,
             READY_FOR_QUERY: self.handle_READY_FOR_QUERY,
@@ -1811,12 +3258,18 @@ class Connection(object):
             PORTAL_SUSPENDED: self.handle_PORTAL_SUSPENDED,
             NO_DATA: self.handle_NO_DATA,
             PARAMETER_DESCRIPTION: self.handle_PARAMETER_DESCRIPTION,
-            NOTIFICATION_RESPONSE: self.handle_NOTIFICATION_RESPONSE,
             COPY_DONE: self.handle_COPY_DONE,
-            COPY_DATA: self.handle_COPY_DATA,
-            COPY_IN_RESPONSE: self.handle_COPY_IN_RESPONSE,
             COPY_OUT_RESPONSE: self.handle_COPY_OUT_RESPONSE}
 
+        # Handlers for the messages that need I/O, or call back into user
+        # code, so they're coroutines.
+        self.coroutine_message_types = {
+            NOTICE_RESPONSE: self.handle_NOTICE_RESPONSE,
+            AUTHENTICATION_REQUEST: self.handle_AUTHENTICATION_REQUEST,
+            NOTIFICATION_RESPONSE: self.handle_NOTIFICATION_RESPONSE,
+            COPY_DATA: self.handle_COPY_DATA,
+            COPY_IN_RESPONSE: self.handle_COPY_IN_RESPONSE}
+
         # Int32 - Message length, including self.
         # Int32(196608) - Protocol version number.  Version 3.0.
         # Any number of key/value pairs, terminated by a zero byte:
@@ -1830,23 +3283,27 @@ class Connection(object):
                 database = database.encode('utf8')
             val.extend(b("database\x00") + database + NULL_BYTE)
         val.append(0)
-        yield from self._write(i_pack(len(val) + 4))
-        yield from self._write(val)
-        yield from self._flush()
+        self._write(i_pack(len(val) + 4))
+        self._write(val)
+        await self._flush()
 
-        self._cursor = yield from self.cursor()
+        self._cursor = await self.cursor()
 
         try:
             self._lock.acquire()
             code = self.error = None
             while code not in (READY_FOR_QUERY, ERROR_RESPONSE):
-                code, data_len = ci_unpack((yield from self._read(5)))
-                data = yield from self._read(data_len - 4)
-                yield from self.message_types[code](data, None)
+                code, data = self._next_message()
+                if code is None:
+                    await self._fill_read_buffer()
+                elif code in self.message_types:
+                    self.message_types[code](data, None)
+                else:
+                    await self.coroutine_message_types[code](data, None)
             if self.error is not None:
                 raise self.error
         except:
-            yield from self._yield_close()
+            await self._yield_close()
             raise
         finally:
             self._lock.release()
@@ -1856,7 +3313,6 @@ class Connection(object):
         self.notifies_lock = RLockWrapper()
 
 
-    @asyncio.coroutine
     def handle_ERROR_RESPONSE(self, data, ps):
         responses = tuple(
             (s[0:1], s[1:].decode(self._client_encoding)) for s in
@@ -1867,42 +3323,33 @@ class Connection(object):
         else:
             self.error = ProgrammingError(*tuple(v for k, v in responses))
 
-    @asyncio.coroutine
     def handle_EMPTY_QUERY_RESPONSE(self, data, ps):
         self.error = ProgrammingError("query was empty")
 
-    @asyncio.coroutine
     def handle_CLOSE_COMPLETE(self, data, ps):
         pass
 
-    @asyncio.coroutine
     def handle_PARSE_COMPLETE(self, data, ps):
         # Byte1('1') - Identifier.
         # Int32(4) - Message length, including self.
         pass
 
-    @asyncio.coroutine
     def handle_BIND_COMPLETE(self, data, ps):
         pass
 
-    @asyncio.coroutine
     def handle_PORTAL_SUSPENDED(self, data, cursor):
         cursor.portal_suspended = True
 
-    @asyncio.coroutine
-    def handle_PARAMETER_DESCRIPTION(self, data, ps):
-        # Well, we don't really care -- we're going to send whatever we
-        # want and let the database deal with it.  But thanks anyways!
-
-        # count = h_unpack(data)[0]
-        # type_oids = unpack_from("!" + "i" * count, data, 2)
-        pass
+    def handle_PARAMETER_DESCRIPTION(self, data, cursor):
+        # Int16 - The number of parameters used by the statement.
+        # For each parameter:
+        #   Int32 - The object ID of the parameter data type.
+        count = h_unpack(data)[0]
+        cursor.ps['param_oids'] = unpack_from("!" + "i" * count, data, 2)
 
-    @asyncio.coroutine
     def handle_COPY_DONE(self, data, ps):
         self._copy_done = True
 
-    @asyncio.coroutine
     def handle_COPY_OUT_RESPONSE(self, data, ps):
         # Int8(1) - 0 textual, 1 binary
         # Int16(2) - Number of columns
@@ -1914,12 +3361,10 @@ class Connection(object):
             raise InterfaceError(
                 "An output stream is required for the COPY OUT response.")
 
-    @asyncio.coroutine
-    def handle_COPY_DATA(self, data, ps):
-        yield from ps.stream.write(data)
+    async def handle_COPY_DATA(self, data, ps):
+        await ps.stream.write(data)
 
-    @asyncio.coroutine
-    def handle_COPY_IN_RESPONSE(self, data, ps):
+    async def handle_COPY_IN_RESPONSE(self, data, ps):
         # Int16(2) - Number of columns
         # Int16(N) - Format codes for each column (0 text, 1 binary)
         is_binary, num_cols = bh_unpack(data)
@@ -1931,32 +3376,35 @@ class Connection(object):
 
         if PY2:
             while True:
-                data = yield from ps.stream.read(8192)
+                data = await ps.stream.read(8192)
                 if not data:
                     break
-                yield from self._write(COPY_DATA + i_pack(len(data) + 4))
-                yield from self._write(data)
-                yield from self._flush()
+                self._write(COPY_DATA + i_pack(len(data) + 4))
+                self._write(data)
+                await self._flush()
         else:
             bffr = bytearray(8192)
             while True:
-                bytes_read = yield from ps.stream.readinto(bffr)
+                bytes_read = await ps.stream.readinto(bffr)
                 if bytes_read == 0:
                     break
-                yield from self._write(COPY_DATA + i_pack(bytes_read + 4))
-                yield from self._write(bffr[:bytes_read])
-                yield from self._flush()
+                self._write(COPY_DATA + i_pack(bytes_read + 4))
+                self._write(bffr[:bytes_read])
+                await self._flush()
 
         # Send CopyDone
         # Byte1('c') - Identifier.
         # Int32(4) - Message length, including self.
-        yield from self._write(COPY_DONE_MSG)
-        yield from self._write(SYNC_MSG)
-        yield from self._flush()
+        self._write(COPY_DONE_MSG)
+
+        # The Sync that followed the Execute was ignored by the server while
+        # in copy mode, so another is needed. A simple query doesn't use one.
+        if not ps.ps.get('simple_query', False):
+            self._write(SYNC_MSG)
+        await self._flush()
 
-    @asyncio.coroutine
-    def handle_NOTIFICATION_RESPONSE(self, data, ps):
-        self.NotificationReceived(data)
+    async def handle_NOTIFICATION_RESPONSE(self, data, ps):
+        await self.NotificationReceived(data)
         ##
         # A message sent if this connection receives a NOTIFY that it was
         # LISTENing for.
@@ -1980,21 +3428,187 @@ class Connection(object):
             self.notifies_lock.release()
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def cursor(self):
+    async def cursor(self, name=None, hold=False):
         """Coroutine. Creates a :class:`Cursor` object bound to this
         connection.
 
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
+
+        :param name:
+            If given, the cursor is a named cursor, which declares its queries
+            as server side cursors of this name. This is a pg8000 extension.
+
+            .. versionadded:: 1.11.0
+
+        :param hold:
+            If True, a named cursor is declared ``WITH HOLD``, so that it can
+            still be read after the transaction has ended, and with autocommit
+            on. This is a pg8000 extension.
+
+            .. versionadded:: 1.11.0
         """
 
-        yield from self._check_sane()
-        return Cursor(self)
+        await self._check_sane()
+        return Cursor(self, name, hold)
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def commit(self):
+    async def prepare(self, operation):
+        """Coroutine. Prepares a statement on the server, and returns a
+        :class:`PreparedStatement` that can be executed many times. This
+        costs a round trip, in which the server describes the types of the
+        parameters and of the result columns.
+
+        The statement isn't part of the implicit statement cache, and stays
+        open on the server until :meth:`PreparedStatement.close` is called.
+
+        This function is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+
+        :param operation:
+            The SQL of the statement, with parameters in the current
+            :data:`paramstyle`.
+
+        :rtype: :class:`PreparedStatement`
+        """
+        try:
+            self._lock.acquire()
+            await self._check_sane()
+            await self._join_prefetch()
+            from . import paramstyle
+            statement, make_args = convert_paramstyle(paramstyle, operation)
+
+            cursor = Cursor(self)
+            self._send_deferred_closes()
+            cursor.ps = ps = self._send_parse(None, None, statement, ())
+            self._write(SYNC_MSG)
+            await self._flush()
+            try:
+                await self.handle_messages(cursor)
+            except Error:
+                self._close_statement(ps)
+                raise
+            self._finish_parse(ps)
+
+            # Parameters of a type that pg8000 has no encoder for are sent
+            # the same way as for an unprepared statement, which depends on
+            # the Python type of the value.
+            ps['param_funcs'] = tuple(
+                self.pg_send_types.get(oid) for oid in ps['param_oids'])
+            if None not in ps['param_funcs']:
+                param_fcs = tuple(fc for fc, f in ps['param_funcs'])
+                ps['bind_1'] = ps['statement_name_bin'] + \
+                    h_pack(len(param_fcs)) + \
+                    pack("!" + "h" * len(param_fcs), *param_fcs) + \
+                    h_pack(len(param_fcs))
+                ps['param_funcs'] = tuple(f for fc, f in ps['param_funcs'])
+                self._make_bind_struct(ps)
+            else:
+                ps['bind_1'] = None
+            return PreparedStatement(self, operation, make_args, ps)
+        finally:
+            self._lock.release()
+
+    def _make_prepared_bind(self, ps, args):
+        if len(args) != len(ps['param_oids']):
+            raise ProgrammingError(
+                "the prepared statement takes " +
+                str(len(ps['param_oids'])) + " parameters, but " +
+                str(len(args)) + " were given")
+
+        bind_2 = ps['bind_2']
+        if ps['bind_1'] is None:
+            params = []
+            for oid, func, value in zip(
+                    ps['param_oids'], ps['param_funcs'], args):
+                if func is None:
+                    oid, fc, send_func = self.make_params((value,))[0]
+                    params.append((fc, send_func))
+                else:
+                    params.append(func)
+            param_fcs = tuple(fc for fc, f in params)
+            ps = {
+                'bind_1': ps['statement_name_bin'] + h_pack(len(params)) +
+                pack("!" + "h" * len(param_fcs), *param_fcs) +
+                h_pack(len(params)),
+                'param_funcs': tuple(f for fc, f in params),
+                'param_oids': ps['param_oids']}
+
+        try:
+            return self._make_bind(UNNAMED_PORTAL, ps, args, bind_2)
+        except (struct_error, TypeError, AttributeError, ValueError,
+                OverflowError):
+            raise DataError(
+                "a parameter value doesn't suit the parameter types " +
+                str(ps['param_oids']), exc_info()[1])
+
+    @public_coroutine_decorator
+    async def _execute_prepared(self, cursor, param_sets):
+        await self._check_sane()
+        await self._join_prefetch()
+        if not self.in_transaction and not self.autocommit:
+            await self.execute(self._cursor, "begin transaction", None)
+
+        ps = cursor.ps
+        cursor._cached_rows.clear()
+        cursor._row_count = -1
+        cursor._decode_row = ps['row_decoder']
+
+        self._send_deferred_closes()
+        mark = len(self._write_buffer)
+        batch_size = 0
+        for args in param_sets:
+            try:
+                bind = self._make_prepared_bind(ps, args)
+            except Error:
+                # Nothing of this batch has been sent yet.
+                del self._write_buffer[mark:]
+                raise
+            self._send_message(BIND, bind)
+            self._send_message(EXECUTE, UNNAMED_PORTAL_ALL_ROWS)
+            batch_size += 1
+
+            if batch_size == self._executemany_batch_size:
+                await self._sync_batch(cursor, None, None, None)
+                self._send_deferred_closes()
+                mark = len(self._write_buffer)
+                batch_size = 0
+
+        if batch_size > 0:
+            await self._sync_batch(cursor, None, None, None)
+
+    StatementCacheEntry = namedtuple(
+        'StatementCacheEntry', ['operation', 'type_oids', 'hits'])
+
+    def statement_cache_info(self):
+        """Returns the contents of the prepared statement cache, as a list of
+        ``StatementCacheEntry`` named tuples with the fields ``operation``,
+        ``type_oids`` (the types of the parameters) and ``hits`` (the number
+        of times the statement has been reused). The list is in least recently
+        used order.
+
+        This function is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+        """
+        return [
+            Connection.StatementCacheEntry(operation, type_oids, ps['hits'])
+            for cache in self._caches.values()
+            for (type_oids, operation), ps in cache['ps'].items()]
+
+    def pipeline(self):
+        """Creates a :class:`Pipeline` object bound to this connection, that
+        sends a number of statements to the server in one go.
+
+        This function is a pg8000 extension.
+
+        .. versionadded:: 1.11.0
+        """
+        return Pipeline(self)
+
+    @public_coroutine_decorator
+    async def commit(self):
         """Coroutine. Commits the current database transaction.
 
         This function is part of the `DBAPI 2.0 specification
@@ -2002,14 +3616,13 @@ class Connection(object):
         """
         try:
             self._lock.acquire()
-            yield from self._check_sane()
-            yield from self.execute(self._cursor, "commit", None)
+            await self._check_sane()
+            await self.execute(self._cursor, "commit", None)
         finally:
             self._lock.release()
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def rollback(self):
+    async def rollback(self):
         """Coroutine. Rolls back the current database transaction.
 
         This function is part of the `DBAPI 2.0 specification
@@ -2017,23 +3630,25 @@ class Connection(object):
         """
         try:
             self._lock.acquire()
-            yield from self._check_sane()
-            yield from self.execute(self._cursor, "rollback", None)
+            await self._check_sane()
+            await self.execute(self._cursor, "rollback", None)
         finally:
             self._lock.release()
 
     #don't use the wrapper, because the wrapper calls this function
-    @asyncio.coroutine
-    def _yield_close(self):
+    async def _yield_close(self):
         if self._writer is None:
             return
+        # The rest of a COPY OUT isn't worth reading.
+        self._copy_out = None
+        await self._join_prefetch()
         try:
             #Why error if the connection is already close, just continue silently
             # Byte1('X') - Identifies the message as a terminate message.
             # Int32(4) - Message length, including self.
-            yield from self._write(TERMINATE_MSG)
-            yield from self._flush()
-            yield from self._yield_close_aiostream()
+            self._write(TERMINATE_MSG)
+            await self._flush()
+            await self._yield_close_aiostream()
         except AttributeError:
             raise InterfaceError("connection is closed")
         except ValueError:
@@ -2043,13 +3658,13 @@ class Connection(object):
         finally:
             #self._usock.close()
             if self._writer is not None:
-                yield from self._yield_close_aiostream()
+                await self._yield_close_aiostream()
             self._writer = None
             self._reader = None
+            self._protocol = None
 
     #don't use the wrapper, because the wrapper calls this function
-    @asyncio.coroutine
-    def yield_close(self):
+    async def yield_close(self):
         """Coroutine. Closes the database connection, the connection
         will be closed upon return.
 
@@ -2058,7 +3673,7 @@ class Connection(object):
         """
         try:
             self._lock.acquire()
-            yield from self._yield_close()
+            await self._yield_close()
         finally:
             self._lock.release()
 
@@ -2070,7 +3685,7 @@ class Connection(object):
         in the future after the next yield to the asyncio event loop.
         
         It also returns the asyncio.Task that it schedules on the loop,
-        so you can `yield from` the task after this function returns.
+        so you can `await` the task after this function returns.
         The reason this is not a coroutine itself is so that this can
         be called from within a context manager, which cannot be
         decorated as a coroutine.
@@ -2082,7 +3697,8 @@ class Connection(object):
         try:
             self._lock.acquire()
             if self.close_future is None:
-                self.close_future = asyncio.async(self.yield_close(), loop=self.loop)
+                self.close_future = asyncio.ensure_future(
+                    self.yield_close(), loop=self.loop)
             
             assert self.close_future is not None
             return self.close_future
@@ -2091,8 +3707,7 @@ class Connection(object):
             
     
 
-    @asyncio.coroutine
-    def handle_AUTHENTICATION_REQUEST(self, data, cursor):
+    async def handle_AUTHENTICATION_REQUEST(self, data, cursor):
         assert self._lock.locked(this_thread=True)
         # Int32 -   An authentication code that represents different
         #           authentication messages:
@@ -2116,9 +3731,9 @@ class Connection(object):
                 raise InterfaceError(
                     "server requesting password authentication, but no "
                     "password was provided")
-            yield from self._send_message(
+            self._send_message(
                             PASSWORD, self.password.encode("ascii") + NULL_BYTE)
-            yield from self._flush()
+            await self._flush()
         elif auth_code == 5:
             ##
             # A message representing the backend requesting an MD5 hashed
@@ -2138,8 +3753,8 @@ class Connection(object):
             # Byte1('p') - Identifies the message as a password message.
             # Int32 - Message length including self.
             # String - The password.  Password may be encrypted.
-            yield from self._send_message(PASSWORD, pwd + NULL_BYTE)
-            yield from self._flush()
+            self._send_message(PASSWORD, pwd + NULL_BYTE)
+            await self._flush()
 
         elif auth_code in (2, 4, 6, 7, 8, 9):
             raise InterfaceError(
@@ -2150,12 +3765,10 @@ class Connection(object):
                 "Authentication method " + str(auth_code) +
                 " not recognized by pg8000.")
 
-    @asyncio.coroutine
     def handle_READY_FOR_QUERY(self, data, ps):
         # Byte1 -   Status indicator.
         self.in_transaction = data != IDLE
 
-    @asyncio.coroutine
     def handle_BACKEND_KEY_DATA(self, data, ps):
         self._backend_key_data = data
 
@@ -2180,8 +3793,12 @@ class Connection(object):
                         "not mapped to pg type")
         return params
 
-    @asyncio.coroutine
     def handle_ROW_DESCRIPTION(self, data, cursor):
+        # A simple query containing several statements sends a
+        # RowDescription for each one that returns rows, and only the last
+        # result is kept.
+        row_desc = cursor.ps['row_desc'] = []
+        cursor._cached_rows.clear()
         count = h_unpack(data)[0]
         idx = 2
         for i in range(count):
@@ -2193,119 +3810,253 @@ class Connection(object):
                     "type_modifier", "format"), ihihih_unpack(data, idx)))
             field['name'] = name
             idx += 18
-            cursor.ps['row_desc'].append(field)
+            row_desc.append(field)
             field['pg8000_fc'], field['func'] = \
                 self.pg_types[field['type_oid']]
 
-    @public_coroutine_decorator
-    @asyncio.coroutine
-    def execute(self, cursor, operation, vals):
-        yield from self._check_sane()
-        if vals is None:
-            vals = ()
-        from . import paramstyle
-        cache = self._caches[paramstyle]
-
+        # A described statement reports the format of every column as text,
+        # which is what the first execution of a statement asks for, and a
+        # simple query returns everything in text.
+        cursor._decode_row = self._text_row_decoder(row_desc)
+
+    def _text_row_decoder(self, row_desc):
+        return self._make_row_decoder(
+            tuple(
+                f['func'] if f['pg8000_fc'] == FC_TEXT
+                else self.pg_text_types[f['type_oid']] for f in row_desc))
+
+    def _make_row_decoder(self, input_funcs):
+        # Returns a function that decodes a DataRow into a list of values.
+        # Where there are columns that come in binary with a fixed width,
+        # the source of a decoder is generated for the row description. The
+        # columns are unrolled, and each run of fixed width columns is
+        # unpacked, along with the length of each value, with a single
+        # struct. If a value in a run turns out to be NULL, the lengths
+        # don't match and that run is decoded a column at a time instead.
+        input_funcs = tuple(
+            func if getattr(func, '__module__', None) == __name__
+            else bytes_decoder(func) for func in input_funcs)
+        recv_formats = self.pg_recv_formats
+        if not any(func in recv_formats for func in input_funcs):
+            def decode_row(data):
+                row = []
+                decode_columns(data, 2, row, input_funcs)
+                return row
+            return decode_row
+
+        namespace = {
+            'decode_columns': decode_columns, 'i_unpack': i_unpack,
+            'struct_error': struct_error}
+        lines = [
+            "def decode_row(data):", "    row = []",
+            "    append = row.append", "    idx = 2"]
+        i = 0
+        while i < len(input_funcs):
+            j = i
+            while j < len(input_funcs) and input_funcs[j] in recv_formats:
+                j += 1
+            if j > i:
+                formats = [recv_formats[f] for f in input_funcs[i:j]]
+                run = Struct('!' + ''.join('i' + fmt for fmt in formats))
+                namespace['unpack_%d' % i] = run.unpack_from
+                namespace['lengths_%d' % i] = tuple(
+                    calcsize('!' + fmt) for fmt in formats)
+                namespace['funcs_%d' % i] = input_funcs[i:j]
+                lines.extend((
+                    "    try:",
+                    "        values = unpack_%d(data, idx)" % i,
+                    "    except struct_error:",
+                    "        values = ()",
+                    "    if values[0::2] == lengths_%d:" % i,
+                    "        row.extend(values[1::2])",
+                    "        idx += %d" % run.size,
+                    "    else:",
+                    "        idx = decode_columns("
+                    "data, idx, row, funcs_%d)" % i))
+                i = j
+            else:
+                namespace['func_%d' % i] = input_funcs[i]
+                lines.extend((
+                    "    vlen = i_unpack(data, idx)[0]",
+                    "    idx += 4",
+                    "    if vlen == -1:",
+                    "        append(None)",
+                    "    else:",
+                    "        append(func_%d(data, idx, vlen))" % i,
+                    "        idx += vlen"))
+                i += 1
+        lines.append("    return row")
+        exec("\n".join(lines), namespace)
+        return namespace['decode_row']
+
+    def _get_statement(self, cache, paramstyle, operation):
+        statements = cache['statement']
         try:
-            statement, make_args = cache['statement'][operation]
+            statements.move_to_end(operation)
+            return statements[operation]
         except KeyError:
             statement, make_args = convert_paramstyle(paramstyle, operation)
-            cache['statement'][operation] = statement, make_args
-
-        args = make_args(vals)
-        params = self.make_params(args)
-
-        key = tuple(oid for oid, x, y in params), operation
+            statements[operation] = statement, make_args
+            while len(statements) > self.statement_cache_size:
+                statements.popitem(last=False)
+            return statement, make_args
 
+    def _get_ps(self, cache, key):
+        # Returns the cached prepared statement for the key, or None.
         try:
             ps = cache['ps'][key]
-            cursor.ps = ps
         except KeyError:
+            return None
+        cache['ps'].move_to_end(key)
+        ps['hits'] += 1
+        return ps
+
+    def _is_hot(self, cache, key):
+        # Counts an execution of a statement that isn't prepared, and returns
+        # True once it has been executed prepare_threshold times.
+        executions = cache['executions']
+        count = executions.pop(key, 0) + 1
+        if count >= self.prepare_threshold:
+            return True
+        executions[key] = count
+        while len(executions) > self.statement_cache_size:
+            executions.popitem(last=False)
+        return False
+
+    def _send_parse(self, cache, key, statement, params, prepare=True):
+        # Sends the Parse and Describe for a new prepared statement, and adds
+        # it to the cache. The bind_2 and row_decoder of the statement are
+        # filled in by _finish_parse once its RowDescription has been read.
+        # If prepare is False, the unnamed statement is used instead, and
+        # isn't cached.
+        if prepare:
             statement_name = "pg8000_statement_" + str(self.statement_number)
             self.statement_number += 1
             statement_name_bin = statement_name.encode('ascii') + NULL_BYTE
-            ps = {
-                'row_desc': [],
-                'param_funcs': tuple(x[2] for x in params),
-            }
-            cursor.ps = ps
-
-            param_fcs = tuple(x[1] for x in params)
-
-            # Byte1('P') - Identifies the message as a Parse command.
-            # Int32 -   Message length, including self.
-            # String -  Prepared statement name. An empty string selects the
-            #           unnamed prepared statement.
-            # String -  The query string.
-            # Int16 -   Number of parameter data types specified (can be zero).
-            # For each parameter:
-            #   Int32 - The OID of the parameter data type.
-            val = bytearray(statement_name_bin)
-            val.extend(statement.encode(self._client_encoding) + NULL_BYTE)
-            val.extend(h_pack(len(params)))
-            for oid, fc, send_func in params:
-                # Parse message doesn't seem to handle the -1 type_oid for NULL
-                # values that other messages handle.  So we'll provide type_oid
-                # 705, the PG "unknown" type.
-                val.extend(i_pack(705 if oid == -1 else oid))
-
-            # Byte1('D') - Identifies the message as a describe command.
-            # Int32 - Message length, including self.
-            # Byte1 - 'S' for prepared statement, 'P' for portal.
-            # String - The name of the item to describe.
-            yield from self._send_message(PARSE, val)
-            yield from self._send_message(DESCRIBE, STATEMENT + statement_name_bin)
-            yield from self._write(SYNC_MSG)
-
-            try:
-                yield from self._flush()
-            except AttributeError:
-                if self._writer is None:
-                    raise InterfaceError("connection is closed")
-                else:
-                    raise exc_info()[1]
-
-            yield from self.handle_messages(cursor)
-
-            # We've got row_desc that allows us to identify what we're
-            # going to get back from this statement.
-            output_fc = tuple(
-                self.pg_types[f['type_oid']][0] for f in ps['row_desc'])
-
-            ps['input_funcs'] = tuple(f['func'] for f in ps['row_desc'])
-            # Byte1('B') - Identifies the Bind command.
-            # Int32 - Message length, including self.
-            # String - Name of the destination portal.
-            # String - Name of the source prepared statement.
-            # Int16 - Number of parameter format codes.
-            # For each parameter format code:
-            #   Int16 - The parameter format code.
-            # Int16 - Number of parameter values.
-            # For each parameter value:
-            #   Int32 - The length of the parameter value, in bytes, not
-            #           including this length.  -1 indicates a NULL parameter
-            #           value, in which no value bytes follow.
-            #   Byte[n] - Value of the parameter.
-            # Int16 - The number of result-column format codes.
-            # For each result-column format code:
-            #   Int16 - The format code.
-            ps['bind_1'] = statement_name_bin + h_pack(len(params)) + \
-                pack("!" + "h" * len(param_fcs), *param_fcs) + \
-                h_pack(len(params))
-
-            ps['bind_2'] = h_pack(len(output_fc)) + \
-                pack("!" + "h" * len(output_fc), *output_fc)
-
-            cache['ps'][key] = ps
+        else:
+            statement_name_bin = NULL_BYTE
+        ps = {
+            'statement_name_bin': statement_name_bin,
+            'row_desc': [],
+            # A parameter of unknown type may be an int or a str, as both
+            # have the same key, so it's sent in a way that suits both.
+            'param_funcs': tuple(
+                self.py_types[int][2] if oid == 705 else send_func
+                for oid, fc, send_func in params),
+            'param_fcs': tuple(x[1] for x in params),
+            'sent_oids': tuple(x[0] for x in params),
+            'hits': 0,
+            # The number of cursors with a portal open on the statement.
+            'portals': 0,
+            'closed': False,
+            'bind_struct': None,
+        }
 
-        cursor._cached_rows.clear()
-        cursor._row_count = -1
-        cursor.portal_name = "pg8000_portal_" + str(self.portal_number)
-        self.portal_number += 1
-        cursor.portal_name_bin = cursor.portal_name.encode('ascii') + NULL_BYTE
-        cursor.execute_msg = cursor.portal_name_bin + \
-            Connection._row_cache_size_bin
+        param_fcs = ps['param_fcs']
 
+        # Byte1('P') - Identifies the message as a Parse command.
+        # Int32 -   Message length, including self.
+        # String -  Prepared statement name. An empty string selects the
+        #           unnamed prepared statement.
+        # String -  The query string.
+        # Int16 -   Number of parameter data types specified (can be zero).
+        # For each parameter:
+        #   Int32 - The OID of the parameter data type.
+        val = bytearray(statement_name_bin)
+        val.extend(statement.encode(self._client_encoding) + NULL_BYTE)
+        val.extend(h_pack(len(params)))
+        for oid, fc, send_func in params:
+            # Parse message doesn't seem to handle the -1 type_oid for NULL
+            # values that other messages handle.  So we'll provide type_oid
+            # 705, the PG "unknown" type.
+            val.extend(i_pack(705 if oid == -1 else oid))
+
+        # Byte1('D') - Identifies the message as a describe command.
+        # Int32 - Message length, including self.
+        # Byte1 - 'S' for prepared statement, 'P' for portal.
+        # String - The name of the item to describe.
+        self._send_message(PARSE, val)
+        self._send_message(DESCRIBE, STATEMENT + statement_name_bin)
+
+        ps['bind_1'] = statement_name_bin + h_pack(len(params)) + \
+            pack("!" + "h" * len(param_fcs), *param_fcs) + \
+            h_pack(len(params))
+
+        if not prepare or cache is None:
+            return ps
+
+        cache['ps'][key] = ps
+        while len(cache['ps']) > self.statement_cache_size:
+            self._close_statement(cache['ps'].popitem(last=False)[1])
+        return ps
+
+    def _finish_parse(self, ps):
+        # We've got row_desc that allows us to identify what we're
+        # going to get back from this statement, so later executions can
+        # ask for the columns in the formats that pg_types decodes.
+        output_fc = tuple(
+            self.pg_types[f['type_oid']][0] for f in ps['row_desc'])
+
+        ps['row_decoder'] = self._make_row_decoder(
+            tuple(f['func'] for f in ps['row_desc']))
+        ps['bind_2'] = h_pack(len(output_fc)) + \
+            pack("!" + "h" * len(output_fc), *output_fc)
+
+        # Parameters sent with the unknown type have been given a type by the
+        # server, as told in the ParameterDescription. If there's a binary
+        # encoder for that type, it's used from now on. It may not suit
+        # every value that comes along for the parameter, for example an
+        # int that's too big for an int4, or a str for an int parameter, so
+        # the original text encoding is kept to fall back on.
+        param_fcs = list(ps['param_fcs'])
+        param_funcs = list(ps['param_funcs'])
+        for i, (sent_oid, oid) in enumerate(
+                zip(ps['sent_oids'], ps.get('param_oids', ()))):
+            if sent_oid == 705 and oid in self.pg_send_types:
+                param_fcs[i], param_funcs[i] = self.pg_send_types[oid]
+
+        if tuple(param_funcs) != ps['param_funcs']:
+            ps['fallback'] = ps['bind_1'], ps['param_funcs']
+            ps['bind_1'] = ps['statement_name_bin'] + \
+                h_pack(len(param_fcs)) + \
+                pack("!" + "h" * len(param_fcs), *param_fcs) + \
+                h_pack(len(param_fcs))
+            ps['param_funcs'] = tuple(param_funcs)
+        self._make_bind_struct(ps)
+
+    def _make_bind_struct(self, ps):
+        # If all the parameters are sent in binary with a fixed width, the
+        # parameter section of a Bind is packed with a single struct, with
+        # the length of each value filled in already.
+        formats = []
+        values = []
+        for send_func in ps['param_funcs']:
+            try:
+                fmt = FIXED_WIDTH_SEND_FORMATS[send_func]
+            except KeyError:
+                return
+            formats.append('i' + fmt)
+            values.extend((calcsize('!' + fmt), None))
+        ps['bind_struct'] = Struct('!' + ''.join(formats))
+        ps['bind_values'] = values
+
+    def _discard_parse(self, cache, key, ps):
+        # The Parse may or may not have succeeded, either way the statement
+        # isn't reused.
+        if cache['ps'].get(key) is ps:
+            del cache['ps'][key]
+        self._close_statement(ps)
+
+    def _close_statement(self, ps):
+        # Called once the statement has left the cache. Closing a statement
+        # also closes its portals, so if a cursor is still reading from one,
+        # the statement is closed along with the last portal instead.
+        ps['closed'] = True
+        if ps['portals'] == 0 and ps['statement_name_bin'] != NULL_BYTE:
+            self._deferred_closes.append(
+                STATEMENT + ps['statement_name_bin'])
+
+    def _make_bind(self, portal_name_bin, ps, args, bind_2):
         # Byte1('B') - Identifies the Bind command.
         # Int32 - Message length, including self.
         # String - Name of the destination portal.
@@ -2322,38 +4073,592 @@ class Connection(object):
         # Int16 - The number of result-column format codes.
         # For each result-column format code:
         #   Int16 - The format code.
-        retval = bytearray(cursor.portal_name_bin + ps['bind_1'])
-        for value, send_func in zip(args, ps['param_funcs']):
+        bind_struct = ps['bind_struct']
+        if bind_struct is not None and None not in args:
+            values = ps['bind_values'][:]
+            try:
+                values[1::2] = args
+                return portal_name_bin + ps['bind_1'] + \
+                    bind_struct.pack(*values) + bind_2
+            except (struct_error, ValueError, OverflowError):
+                # Let the general case below deal with it.
+                pass
+
+        try:
+            return self._pack_bind(
+                portal_name_bin, ps['bind_1'], ps['param_funcs'], args,
+                bind_2)
+        except (struct_error, TypeError, AttributeError, OverflowError):
+            if 'fallback' not in ps:
+                raise
+            bind_1, param_funcs = ps['fallback']
+            return self._pack_bind(
+                portal_name_bin, bind_1, param_funcs, args, bind_2)
+
+    def _pack_bind(self, portal_name_bin, bind_1, param_funcs, args, bind_2):
+        retval = bytearray(portal_name_bin + bind_1)
+        for value, send_func in zip(args, param_funcs):
             if value is None:
                 val = NULL
             else:
                 val = send_func(value)
                 retval.extend(i_pack(len(val)))
             retval.extend(val)
-        retval.extend(ps['bind_2'])
+        retval.extend(bind_2)
+        return retval
+
+    @public_coroutine_decorator
+    async def execute(self, cursor, operation, vals):
+        await self._check_sane()
+        await self._join_prefetch()
+        if vals is None:
+            vals = ()
+        from . import paramstyle
+        cache = self._caches[paramstyle]
+        statement, make_args = self._get_statement(
+            cache, paramstyle, operation)
 
-        yield from self._send_message(BIND, retval)
-        yield from self.send_EXECUTE(cursor)
-        yield from self._write(SYNC_MSG)
-        yield from self._flush()
-        yield from self.handle_messages(cursor)
+        args = make_args(vals)
         if cursor.portal_suspended:
+            self.close_portal(cursor)
+        # The rows of a simple query can't be fetched in batches, so a cursor
+        # that asks for batches gets a portal, unless autocommit would close
+        # the portal after the first batch.
+        if len(args) == 0 and self.use_simple_query and self._text_styles \
+                and (self.autocommit or not (
+                    cursor._fetch_size_set or cursor.prefetch)):
+            await self._execute_simple(cursor, statement)
+            return
+
+        params = self.make_params(args)
+
+        key = tuple(oid for oid, x, y in params), operation
+
+        ps = self._get_ps(cache, key)
+        if ps is None and not self._text_styles:
+            ps = await self._describe(
+                cursor, cache, key, statement, params,
+                self._is_hot(cache, key))
+        self._send_deferred_closes()
+        mark = len(self._write_buffer)
+        if ps is not None:
+            cursor._decode_row = ps['row_decoder']
+            bind_2 = ps['bind_2']
+            new_statement = False
+        else:
+            ps = self._send_parse(
+                cache, key, statement, params, self._is_hot(cache, key))
+            cursor._decode_row = None
+
+            # The result types won't be known until the RowDescription comes
+            # back, so this first time around all the columns are requested in
+            # text, and handle_ROW_DESCRIPTION picks the text decoders.
+            bind_2 = TEXT_RESULTS
+            new_statement = True
+        cursor.ps = ps
+
+        cursor._cached_rows.clear()
+        cursor._row_count = -1
+        cursor.portal_name = "pg8000_portal_" + str(self.portal_number)
+        self.portal_number += 1
+        cursor.portal_name_bin = cursor.portal_name.encode('ascii') + NULL_BYTE
+        cursor._adaptive_fetch_size = self._initial_fetch_size
+        ps['portals'] += 1
+
+        try:
+            bind = self._make_bind(cursor.portal_name_bin, ps, args, bind_2)
+        except Error:
+            # The Parse hasn't gone to the server yet, so it's dropped too.
+            del self._write_buffer[mark:]
+            ps['portals'] -= 1
+            if new_statement:
+                self._discard_parse(cache, key, ps)
+            raise
+        self._send_message(BIND, bind)
+        self.send_EXECUTE(cursor)
+        self._write(SYNC_MSG)
+
+        try:
+            await self._flush()
+        except AttributeError:
+            if self._writer is None:
+                raise InterfaceError("connection is closed")
+            else:
+                raise exc_info()[1]
+
+        read_from = self._read_offset + self._read_position
+        try:
+            await self.handle_messages(cursor)
+        except Error:
+            self.close_portal(cursor)
+            if new_statement:
+                self._discard_parse(cache, key, ps)
+            raise
+
+        if new_statement:
+            self._finish_parse(ps)
+
+        if cursor.portal_suspended:
+            self._adapt_fetch_size(
+                cursor, len(cursor._cached_rows), read_from)
             if self.autocommit:
+                # The portal has gone with the end of the transaction.
+                self.close_portal(cursor)
                 raise InterfaceError(
                     "With autocommit on, it's not possible to retrieve more "
-                    "rows than the pg8000 cache size, as the portal is closed "
-                    "when the transaction is closed.")
+                    "rows than the fetch_size of the cursor, as the portal "
+                    "is closed when the transaction is closed.")
+
+        else:
+            self.close_portal(cursor)
+
+    @public_coroutine_decorator
+    async def declare(self, cursor, operation, vals):
+        # The query is declared as a server side cursor, and then read as the
+        # portal of the same name, so its rows are fetched like those of any
+        # other portal, with Execute messages of fetch_size rows. This costs a
+        # second round trip, in which the portal is described and its first
+        # rows fetched. Executed from the protocol, a declared cursor always
+        # sends its rows in text, as BINARY only applies to a FETCH.
+        await self.execute(
+            cursor, "DECLARE \"" + cursor.name.replace('"', '""') +
+            "\" NO SCROLL CURSOR " + ("WITH HOLD " if cursor.hold else "") +
+            "FOR " + operation, vals)
+
+        # Closing the portal has nothing to do with a statement.
+        cursor.ps = {
+            'row_desc': [], 'portals': 1, 'closed': True,
+            'statement_name_bin': NULL_BYTE}
+        cursor._decode_row = None
+        cursor._row_count = -1
+        cursor.portal_name = cursor.name
+        cursor.portal_name_bin = \
+            cursor.name.encode(self._client_encoding) + NULL_BYTE
+        cursor._adaptive_fetch_size = self._initial_fetch_size
 
+        # Byte1('D') - Identifies the message as a describe message.
+        # Int32 - Message length, including self.
+        # Byte1 - 'S' for a prepared statement, 'P' for a portal.
+        # String - The name of the item to describe.
+        self._send_message(DESCRIBE, PORTAL + cursor.portal_name_bin)
+        self.send_EXECUTE(cursor)
+        self._write(SYNC_MSG)
+        await self._flush()
+
+        read_from = self._read_offset + self._read_position
+        try:
+            await self.handle_messages(cursor)
+        except Error:
+            self.close_portal(cursor)
+            raise
+
+        if cursor.portal_suspended:
+            self._adapt_fetch_size(
+                cursor, len(cursor._cached_rows), read_from)
         else:
-            yield from self.close_portal(cursor)
+            self.close_portal(cursor)
+
+    @public_coroutine_decorator
+    async def copy_out(self, cursor, operation, iterator):
+        # The types of the columns of a binary COPY aren't sent with it, so
+        # the query is parsed into the unnamed statement and described
+        # first. The COPY is then sent as a simple query, and its rows are
+        # read a batch at a time by _read_copy_out, as the iterator asks for
+        # them.
+        await self._check_sane()
+        await self._join_prefetch()
+        from . import paramstyle
+        statement, make_args = self._get_statement(
+            self._caches[paramstyle], paramstyle, operation)
+        if cursor.portal_suspended:
+            self.close_portal(cursor)
+
+        self._send_deferred_closes()
+        cursor.ps = self._send_parse(None, None, statement, (), False)
+        cursor._decode_row = None
+        cursor._cached_rows.clear()
+        cursor._row_count = -1
+        self._write(SYNC_MSG)
+        await self._flush()
+        await self.handle_messages(cursor)
+
+        funcs = []
+        for f in cursor.ps['row_desc']:
+            if f['pg8000_fc'] == FC_BINARY:
+                funcs.append(f['func'])
+            elif f['type_oid'] in self.pg_copy_types:
+                funcs.append(self.pg_copy_types[f['type_oid']])
+            else:
+                raise NotSupportedError(
+                    "type " + str(f['type_oid']) +
+                    " can't be received in binary")
+        if len(funcs) == 0:
+            raise ProgrammingError("no result set")
+        iterator._decode_row = self._make_row_decoder(tuple(funcs))
+
+        # Byte1('Q') - Identifies the message as a simple query.
+        # Int32 - Message length, including self.
+        # String - The query string itself.
+        self._send_message(
+            QUERY, (
+                "COPY (" + statement + ") TO STDOUT WITH (FORMAT binary)"
+            ).encode(self._client_encoding) + NULL_BYTE)
+        await self._flush()
+        self._copy_out = iterator
+
+    async def _read_copy_out(self, iterator, count=None):
+        # Reads the CopyData messages of a binary COPY OUT until the iterator
+        # holds count rows, or until the end of the COPY if count is None.
+        # Each CopyData is a row of the COPY, which has the same layout as a
+        # DataRow, apart from the header in front of the first one and the
+        # trailer of a field count of -1 at the end. The rows that are
+        # already in the read buffer are decoded straight from it, and the
+        # rest of the messages go through _next_message.
+        code = self.error = None
+        rows = iterator._rows
+        append = rows.append
+        decode_row = iterator._decode_row
+        cursor = iterator._cursor
+        message_types = self.message_types
+        buf = self._read_buffer
+        # The values of bytea columns are memoryviews of a copy of the row,
+        # as they are for a DataRow.
+        view = self.bytea_memoryview
+
+        try:
+            while count is None or len(rows) < count:
+                pos = self._read_position
+                end = len(buf)
+                while not iterator._header and end - pos >= 5 and \
+                        buf[pos] == 100:  # COPY_DATA
+                    msg_end = pos + 1 + i_unpack(buf, pos + 1)[0]
+                    if msg_end > end or buf[pos + 5] == 255:  # The trailer
+                        break
+                    data = buf[pos + 5:msg_end]
+                    if view:
+                        data = memoryview(bytes(data))
+                    append(decode_row(data))
+                    pos = msg_end
+                    if count is not None and len(rows) >= count:
+                        break
+                self._read_position = pos
+                if count is not None and len(rows) >= count:
+                    break
+
+                code, data = self._next_message()
+                if code == COPY_DATA:
+                    if iterator._header:
+                        # Byte11 - The signature, PGCOPY\n\377\r\n\0.
+                        # Int32 - Flags.
+                        # Int32 - The length of the header extension.
+                        # Byte[n] - The header extension.
+                        iterator._header = False
+                        data = data[19 + i_unpack(data, 15)[0]:]
+                    if data[:2] != COPY_TRAILER:
+                        append(decode_row(memoryview(data) if view else data))
+                elif code == COPY_OUT_RESPONSE:
+                    pass
+                elif code is None:
+                    await self._fill_read_buffer()
+                elif code in message_types:
+                    message_types[code](data, cursor)
+                else:
+                    await self.coroutine_message_types[code](data, cursor)
+                if code == READY_FOR_QUERY:
+                    iterator._finished = True
+                    self._copy_out = None
+                    break
+        except:
+            self._copy_out = None
+            await self._yield_close()
+            raise
+
+        if self.error is not None:
+            raise self.error
+
+    async def _describe(self, cursor, cache, key, statement, params,
+                        prepare=True):
+        # Parses and describes a new statement in a round trip of its own,
+        # and returns it with its bind_2 and row_decoder filled in, so that
+        # even its first execution gets its results in the formats of
+        # pg_types. This is for when the session's styles are ones that the
+        # text decoders can't read.
+        self._send_deferred_closes()
+        ps = self._send_parse(cache, key, statement, params, prepare)
+        self._write(SYNC_MSG)
+        await self._flush()
+        cursor.ps = ps
+        try:
+            await self.handle_messages(cursor)
+        except Error:
+            self._discard_parse(cache, key, ps)
+            raise
+        self._finish_parse(ps)
+        return ps
+
+    async def _execute_simple(self, cursor, statement):
+        # There's no prepared statement, so the cursor gets a ps of its own
+        # for handle_ROW_DESCRIPTION to fill in.
+        cursor.ps = {'row_desc': [], 'simple_query': True}
+        cursor._decode_row = None
+        cursor._cached_rows.clear()
+        cursor._row_count = -1
+        cursor.portal_suspended = False
+
+        # Byte1('Q') - Identifies the message as a simple query.
+        # Int32 - Message length, including self.
+        # String - The query string itself.
+        self._send_deferred_closes()
+        self._send_message(
+            QUERY, statement.encode(self._client_encoding) + NULL_BYTE)
+        await self._flush()
+        await self.handle_messages(cursor)
+
+    @public_coroutine_decorator
+    async def executemany(self, cursor, operation, param_sets):
+        # Each parameter set is bound to the unnamed portal and executed in
+        # full, with a single Sync at the end of every batch of
+        # _executemany_batch_size sets. If a parameter set fails, the server
+        # skips the rest of its batch, so with autocommit on none of the batch
+        # takes effect, while the batches before it have been committed.
+        await self._check_sane()
+        await self._join_prefetch()
+        from . import paramstyle
+        cache = self._caches[paramstyle]
+        statement, make_args = self._get_statement(
+            cache, paramstyle, operation)
+
+        if cursor.portal_suspended:
+            self.close_portal(cursor)
+        cursor._cached_rows.clear()
+        cursor._row_count = -1
+
+        # A statement that's new in a batch needs its RowDescription to be
+        # read before another new statement is described, so a new statement
+        # always starts a batch of its own. Results are requested in text, as
+        # that's the format the statement that's new in the batch returns
+        # them in, unless the session's styles are ones that the text decoders
+        # can't read. Then a new statement is described before its batch, and
+        # the results are requested in the formats of pg_types, and a batch
+        # only has one statement, as the cursor decodes the rows of them all.
+        text_results = self._text_styles
+        new_ps = new_key = None
+        batch_size = 0
+        mark = len(self._write_buffer)
+        for vals in param_sets:
+            try:
+                args = make_args(vals)
+                params = self.make_params(args)
+                key = tuple(oid for oid, x, y in params), operation
+
+                ps = self._get_ps(cache, key)
+                if batch_size > 0 and (ps is None or not text_results and
+                                       ps is not cursor.ps):
+                    await self._sync_batch(
+                        cursor, cache, new_key, new_ps)
+                    new_ps = new_key = None
+                    batch_size = 0
+                if ps is None and not text_results:
+                    ps = await self._describe(
+                        cursor, cache, key, statement, params)
+
+                if batch_size == 0:
+                    self._send_deferred_closes()
+                    mark = len(self._write_buffer)
+
+                # Only the first statement of a batch can be new, and the
+                # cursor keeps that one, for its RowDescription.
+                if ps is None:
+                    ps = self._send_parse(cache, key, statement, params)
+                    new_ps, new_key = ps, key
+                    cursor._decode_row = None
+                    cursor.ps = ps
+                elif batch_size == 0:
+                    cursor._decode_row = self._text_row_decoder(
+                        ps['row_desc']) if text_results \
+                        else ps['row_decoder']
+                    cursor.ps = ps
+
+                bind = self._make_bind(
+                    UNNAMED_PORTAL, ps, args,
+                    TEXT_RESULTS if text_results else ps['bind_2'])
+            except Error:
+                # A parameter set that can't be sent. The batch so far hasn't
+                # gone to the server, so it's dropped.
+                del self._write_buffer[mark:]
+                if new_ps is not None:
+                    self._discard_parse(cache, new_key, new_ps)
+                raise
+            self._send_message(BIND, bind)
+            self._send_message(EXECUTE, UNNAMED_PORTAL_ALL_ROWS)
+            batch_size += 1
+
+            if batch_size == self._executemany_batch_size:
+                await self._sync_batch(cursor, cache, new_key, new_ps)
+                new_ps = new_key = None
+                batch_size = 0
+
+        if batch_size > 0:
+            await self._sync_batch(cursor, cache, new_key, new_ps)
+
+    @public_coroutine_decorator
+    async def _execute_pipeline(self, queue):
+        await self._check_sane()
+        await self._join_prefetch()
+        from . import paramstyle
+        cache = self._caches[paramstyle]
+
+        if not self.in_transaction and not self.autocommit:
+            queue.insert(0, (self._cursor, "begin transaction", None, None))
+
+        if not self._text_styles:
+            # The text decoders can't read the session's styles, so the new
+            # statements are described before the flight, rather than having
+            # their results returned in text.
+            described = []
+            for entry in queue:
+                cursor, operation, vals, future = entry
+                try:
+                    statement, make_args = self._get_statement(
+                        cache, paramstyle, operation)
+                    params = self.make_params(
+                        make_args(() if vals is None else vals))
+                    key = tuple(oid for oid, x, y in params), operation
+                    if key not in cache['ps']:
+                        await self._describe(
+                            cursor, cache, key, statement, params)
+                except Error:
+                    if future is not None:
+                        future.set_exception(exc_info()[1])
+                    continue
+                described.append(entry)
+            queue = described
+
+        # Every statement is bound to the unnamed portal, executed in full,
+        # and followed by a Sync. So the response to each statement ends with
+        # a ReadyForQuery, and handle_messages can read them one at a time.
+        self._send_deferred_closes()
+        sent = []
+        for cursor, operation, vals, future in queue:
+            ps = key = None
+            new_statement = False
+            try:
+                statement, make_args = self._get_statement(
+                    cache, paramstyle, operation)
+                args = make_args(() if vals is None else vals)
+                params = self.make_params(args)
+                key = tuple(oid for oid, x, y in params), operation
+
+                ps = self._get_ps(cache, key)
+                if ps is None:
+                    ps = self._send_parse(
+                        cache, key, statement, params,
+                        self._is_hot(cache, key))
+                    new_statement = True
+                cursor.ps = ps
+                cursor._cached_rows.clear()
+                cursor._row_count = -1
+                cursor.portal_suspended = False
+
+                # A statement that's still being parsed, earlier in this
+                # flight, returns its results in text the same as a new one.
+                text_results = 'bind_2' not in ps
+                bind = self._make_bind(
+                    UNNAMED_PORTAL, ps, args,
+                    TEXT_RESULTS if text_results else ps['bind_2'])
+            except Error:
+                if not new_statement:
+                    if future is not None:
+                        future.set_exception(exc_info()[1])
+                    continue
+                # The Parse has already gone out, and needs its Sync.
+                sent.append((
+                    cursor, future, cache, key, ps, True, True,
+                    exc_info()[1]))
+                self._write(SYNC_MSG)
+                continue
+
+            self._send_message(BIND, bind)
+            self._send_message(EXECUTE, UNNAMED_PORTAL_ALL_ROWS)
+            self._write(SYNC_MSG)
+            sent.append((
+                cursor, future, cache, key, ps, new_statement, text_results,
+                None))
+
+        if len(sent) == 0:
+            return
+
+        await self._flush()
+
+        try:
+            for i, (cursor, future, cache, key, ps, new_statement,
+                    text_results, error) in enumerate(sent):
+                if new_statement:
+                    cursor._decode_row = None
+                elif text_results:
+                    cursor._decode_row = self._text_row_decoder(
+                        ps['row_desc'])
+                else:
+                    cursor._decode_row = ps['row_decoder']
+
+                try:
+                    await self.handle_messages(cursor)
+                except Error:
+                    error = exc_info()[1]
+                    if new_statement:
+                        self._discard_parse(cache, key, ps)
+                else:
+                    if new_statement and error is None:
+                        self._finish_parse(ps)
+
+                if future is None or future.cancelled():
+                    continue
+                if error is None:
+                    future.set_result(cursor)
+                else:
+                    future.set_exception(error)
+        except:
+            # The connection has failed, so none of the remaining statements
+            # will get a result.
+            for entry in sent[i:]:
+                future = entry[1]
+                if future is not None and not future.done():
+                    future.set_exception(exc_info()[1])
+            raise
+
+    async def _sync_batch(self, cursor, cache, new_key, new_ps):
+        self._write(SYNC_MSG)
+        await self._flush()
+        try:
+            await self.handle_messages(cursor)
+        except Error:
+            cursor._row_count = -1
+            if new_ps is not None:
+                self._discard_parse(cache, new_key, new_ps)
+            raise
+
+        if new_ps is not None:
+            self._finish_parse(new_ps)
+
+    def _write(self, data):
+        self._write_buffer.extend(data)
 
-    @asyncio.coroutine
     def _send_message(self, code, data):
+        # No Flush message is added, every flight of messages either ends
+        # with a Sync or isn't part of the extended query protocol.
+        buf = self._write_buffer
+        buf.extend(code)
+        buf.extend(i_pack(len(data) + 4))
+        buf.extend(data)
+
+    async def _flush(self):
+        # Hands everything written since the last flush to the writer as a
+        # single chunk.
+        data = bytes(self._write_buffer)
+        del self._write_buffer[:]
         try:
-            yield from self._write(code)
-            yield from self._write(i_pack(len(data) + 4))
-            yield from self._write(data)
-            yield from self._write(FLUSH_MSG)
+            self._writer.write(data)
+            await self._writer.drain()
         except ValueError:
             if str(exc_info()[1]) == "write to closed file":
                 raise InterfaceError("connection is closed")
@@ -2362,22 +4667,23 @@ class Connection(object):
         except AttributeError:
             raise InterfaceError("connection is closed")
 
-    @asyncio.coroutine
-    def send_EXECUTE(self, cursor):
+    def send_EXECUTE(self, cursor, max_rows=None):
         # Byte1('E') - Identifies the message as an execute message.
         # Int32 -   Message length, including self.
         # String -  The name of the portal to execute.
         # Int32 -   Maximum number of rows to return, if portal
         #           contains a query # that returns rows.
         #           0 = no limit.
+        if max_rows is None:
+            max_rows = cursor.fetch_size
+            if max_rows is None:
+                max_rows = cursor._adaptive_fetch_size
         cursor.portal_suspended = False
-        yield from self._send_message(EXECUTE, cursor.execute_msg)
+        self._send_message(EXECUTE, cursor.portal_name_bin + i_pack(max_rows))
 
-    @asyncio.coroutine
     def handle_NO_DATA(self, msg, ps):
         pass
 
-    @asyncio.coroutine
     def handle_COMMAND_COMPLETE(self, data, cursor):
         values = data[:-1].split(BINARY_SPACE)
         command = values[0]
@@ -2389,62 +4695,121 @@ class Connection(object):
                 cursor._row_count += row_count
 
         if command in DDL_COMMANDS:
-            for k in self._caches:
-                self._caches[k]['ps'].clear()
+            for cache in self._caches.values():
+                for ps in cache['ps'].values():
+                    self._close_statement(ps)
+                cache['ps'].clear()
 
-    @asyncio.coroutine
     def handle_DATA_ROW(self, data, cursor):
-        data_idx = 2
-        row = []
-        for func in cursor.ps['input_funcs']:
-            vlen = i_unpack(data, data_idx)[0]
-            data_idx += 4
-            if vlen == -1:
-                row.append(None)
-            else:
-                row.append(func(data, data_idx, vlen))
-                data_idx += vlen
-        cursor._cached_rows.append(row)
+        cursor._cached_rows.append(cursor._decode_row(data))
 
-    @asyncio.coroutine
-    def handle_messages(self, cursor):
+    async def handle_messages(self, cursor):
         code = self.error = None
+        message_types = self.message_types
+        next_message = self._next_message
 
         try:
             while code != READY_FOR_QUERY:
-                code, data_len = ci_unpack( (yield from self._read(5)) )
-                buf = yield from self._read(data_len - 4)
-                yield from self.message_types[code](buf, cursor)
+                code, data = next_message()
+                handler = message_types.get(code)
+                if handler is not None:
+                    # Rows and the rest of the messages that need no I/O
+                    # are handled without going through a coroutine.
+                    handler(data, cursor)
+                elif code is None:
+                    await self._fill_read_buffer()
+                else:
+                    await self.coroutine_message_types[code](
+                        data, cursor)
         except:
-            yield from self._yield_close()
+            await self._yield_close()
             raise
 
         if self.error is not None:
             raise self.error
 
+    # Byte1 - Identifies the message type.
+    # Int32 - Message length, including self.
+    # Byte[n] - The message contents.
+    def _next_message(self):
+        # Returns the code and contents of the next complete message in the
+        # read buffer, or (None, None) if more bytes have to be read first.
+        # The contents of a DataRow may be a bytearray or a memoryview
+        # rather than bytes. A memoryview of the read buffer has to be gone
+        # before the buffer is changed, so it's only ever handed to the row
+        # decoders, whose values never refer to it, and which only pass it
+        # on to the decoders of the driver.
+        buf = self._read_buffer
+        pos = self._read_position
+        if len(buf) - pos >= 5:
+            code, data_len = ci_unpack(buf, pos)
+            end = pos + 1 + data_len
+            if len(buf) >= end:
+                self._read_position = end
+                if code != DATA_ROW:
+                    return code, bytes(buf[pos + 5:end])
+                elif self.bytea_memoryview:
+                    return code, memoryview(
+                        bytes(memoryview(buf)[pos + 5:end]))
+                elif data_len > self._row_view_size:
+                    return code, memoryview(buf)[pos + 5:end]
+                else:
+                    return code, buf[pos + 5:end]
+        return None, None
+
+    async def _fill_read_buffer(self):
+        # Incoming bytes that haven't yet been handled start at
+        # _read_position.
+        del self._read_buffer[:self._read_position]
+        self._read_offset += self._read_position
+        self._read_position = 0
+        if self._protocol is not None:
+            # The protocol adds to the read buffer itself.
+            await self._protocol.wait_for_data()
+            return
+
+        try:
+            data = await self._reader.read(self._read_chunk_size)
+        except AttributeError:
+            raise InterfaceError("connection is closed")
+        if len(data) == 0:
+            raise InterfaceError("connection is closed")
+        self._read_buffer.extend(data)
+
     # Byte1('C') - Identifies the message as a close command.
     # Int32 - Message length, including self.
     # Byte1 - 'S' for prepared statement, 'P' for portal.
     # String - The name of the item to close.
-    @asyncio.coroutine
     def close_portal(self, cursor):
-        yield from self._check_sane()
-        yield from self._send_message(CLOSE, PORTAL + cursor.portal_name_bin)
-        yield from self._write(SYNC_MSG)
-        yield from self._flush()
-        yield from self.handle_messages(cursor)
+        # The portal isn't closed straight away, the Close message goes out
+        # with the next flight of messages. Closing a portal that has since
+        # been destroyed by the end of its transaction isn't an error.
+        self._deferred_closes.append(PORTAL + cursor.portal_name_bin)
+        cursor.portal_suspended = False
+
+        ps = cursor.ps
+        ps['portals'] -= 1
+        if ps['closed'] and ps['portals'] == 0 and \
+                ps['statement_name_bin'] != NULL_BYTE:
+            self._deferred_closes.append(
+                STATEMENT + ps['statement_name_bin'])
+
+    def _send_deferred_closes(self):
+        # Each Close is answered with a CloseComplete, which handle_messages
+        # skips over while reading the response to the rest of the flight.
+        for close_msg in self._deferred_closes:
+            self._send_message(CLOSE, close_msg)
+        del self._deferred_closes[:]
 
     # Byte1('N') - Identifier
     # Int32 - Message length
     # Any number of these, followed by a zero byte:
     #   Byte1 - code identifying the field type (see responseKeys)
     #   String - field value
-    @asyncio.coroutine
-    def handle_NOTICE_RESPONSE(self, data, ps):
+    async def handle_NOTICE_RESPONSE(self, data, ps):
         resp = dict((s[0:1], s[1:]) for s in data.split(NULL_BYTE))
-        yield from self.NoticeReceived(resp)
+        await self.NoticeReceived(resp)
 
-    @asyncio.coroutine
     def handle_PARAMETER_STATUS(self, data, ps):
         pos = data.find(NULL_BYTE)
         key, value = data[:pos], data[pos + 1:-1]
@@ -2467,6 +4832,10 @@ class Connection(object):
                 self.py_types[datetime.timedelta] = (
                     1186, FC_BINARY, interval_send_integer)
                 self.pg_types[1186] = (FC_BINARY, interval_recv_integer)
+                self.pg_send_types.update({
+                    1114: (FC_BINARY, timestamp_send_integer),
+                    1184: (FC_BINARY, timestamptz_send_integer),
+                    1186: (FC_BINARY, interval_send_integer)})
             else:
                 self.py_types[1114] = (1114, FC_BINARY, timestamp_send_float)
                 self.pg_types[1114] = (FC_BINARY, timestamp_recv_float)
@@ -2478,29 +4847,114 @@ class Connection(object):
                 self.py_types[datetime.timedelta] = (
                     1186, FC_BINARY, interval_send_float)
                 self.pg_types[1186] = (FC_BINARY, interval_recv_float)
+                self.pg_send_types.update({
+                    1114: (FC_BINARY, timestamp_send_float),
+                    1184: (FC_BINARY, timestamptz_send_float),
+                    1186: (FC_BINARY, interval_send_float)})
+
+        elif key in (b("DateStyle"), b("IntervalStyle")):
+            self._styles[key] = value
+            self._set_text_styles()
 
         elif key == b("server_version"):
-            self._server_version = LooseVersion(value.decode('ascii'))
-            if self._server_version < LooseVersion('8.2.0'):
+            # For example '9.4.1', '10beta1' or '16.2 (Debian 16.2-1)'.
+            self._server_version = tuple(
+                int(v) for v in re.match(
+                    r'\d+(\.\d+)*', value.decode('ascii')).group().split('.'))
+            if self._server_version < (8, 2):
                 self._commands_with_count = (
                     b("INSERT"), b("DELETE"), b("UPDATE"), b("MOVE"),
                     b("FETCH"))
-            elif self._server_version < LooseVersion('9.0.0'):
+            elif self._server_version < (9, 0):
                 self._commands_with_count = (
                     b("INSERT"), b("DELETE"), b("UPDATE"), b("MOVE"),
                     b("FETCH"), b("COPY"))
+            self._exact_float_text = self._server_version >= (12,)
+            self._set_text_styles()
+
+    def _set_text_styles(self):
+        self._text_styles = self._exact_float_text and \
+            self._styles[b("DateStyle")].startswith(b("ISO")) and \
+            self._styles[b("IntervalStyle")] == b("postgres")
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def poll_rows(self, cur):
+    async def poll_rows(self, cur, max_rows=None):
+        await self._join_prefetch()
+        await self._fetch_batch(cur, max_rows)
 
+    @public_coroutine_decorator
+    async def _fetch_batch(self, cur, max_rows=None):
         if cur.portal_suspended:
-            yield from self.send_EXECUTE(cur)
-            yield from self._write(SYNC_MSG)
-            yield from self._flush()
-            yield from self.handle_messages(cur)
-            if not cur.portal_suspended:
-                yield from self.close_portal(cur)
+            self._send_deferred_closes()
+            self.send_EXECUTE(cur, max_rows)
+            self._write(SYNC_MSG)
+            await self._flush()
+            row_count = len(cur._cached_rows)
+            read_from = self._read_offset + self._read_position
+            await self.handle_messages(cur)
+            if cur.portal_suspended:
+                self._adapt_fetch_size(
+                    cur, len(cur._cached_rows) - row_count, read_from)
+            else:
+                self.close_portal(cur)
+
+    def _start_prefetch(self, cursor):
+        # Starts fetching the next batch of rows for the cursor in the
+        # background, unless a fetch is already under way, or the rows of a
+        # COPY OUT are still coming in, which the fetch would have to read
+        # first.
+        if self._prefetch is None and self._copy_out is None:
+            self._prefetch_cursor = cursor
+            self._prefetch = asyncio.ensure_future(
+                self._prefetch_rows(cursor), loop=self.loop)
+
+    async def _prefetch_rows(self, cursor):
+        # There's nobody to raise an error to while the rows are being
+        # fetched, so it's kept for the cursor to raise when it gets to the
+        # rows that are missing.
+        try:
+            await self._fetch_batch(cursor)
+            if cursor.closed and cursor.portal_suspended:
+                self.close_portal(cursor)
+        except Exception as e:
+            cursor._prefetch_error = e
+        finally:
+            self._prefetch = self._prefetch_cursor = None
+
+    async def _join_prefetch(self):
+        # Called before anything else is sent to the server, as the messages
+        # of a prefetch, or of a COPY OUT that's being iterated over, have to
+        # be read before those of what comes next.
+        await self._wait_prefetch()
+        iterator = self._copy_out
+        if iterator is not None:
+            try:
+                await self._read_copy_out(iterator)
+            except Error as e:
+                iterator._error = e
+
+    async def _wait_prefetch(self):
+        # A prefetch that runs into an error closes the connection from
+        # within its own task, which mustn't wait for itself.
+        prefetch = self._prefetch
+        if prefetch is not None and prefetch is not current_task(self.loop):
+            await asyncio.shield(prefetch)
+
+    def _adapt_fetch_size(self, cursor, row_count, read_from):
+        # Called after a batch of rows has been read from a portal that has
+        # more to come, if the fetch_size of the cursor is None. Each batch
+        # costs a round trip, so the number of rows asked for is doubled
+        # every time, until the rows would take up more than
+        # fetch_buffer_size bytes, going by how wide the rows of this batch
+        # were.
+        if cursor.fetch_size is not None or row_count == 0:
+            return
+        row_bytes = (self._read_offset + self._read_position - read_from) / \
+            row_count
+        cursor._adaptive_fetch_size = max(
+            1, min(
+                cursor._adaptive_fetch_size * 2,
+                int(self.fetch_buffer_size / row_bytes)))
 
     def array_inspect(self, value):
         # Check if array has any values.  If not, we can't determine the proper
@@ -2608,8 +5062,7 @@ class Connection(object):
         return (format_id, global_transaction_id, branch_qualifier)
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def tpc_begin(self, xid):
+    async def tpc_begin(self, xid):
         """Coroutine. Begins a TPC transaction with the given transaction ID xid.
 
         This method should be called outside of a transaction (i.e. nothing may
@@ -2622,14 +5075,13 @@ class Connection(object):
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         self._xid = xid
         if self.autocommit:
-            yield from self.execute(self._cursor, "begin transaction", None)
+            await self.execute(self._cursor, "begin transaction", None)
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def tpc_prepare(self):
+    async def tpc_prepare(self):
         """Coroutine. Performs the first phase of a transaction started with .tpc_begin().
         A ProgrammingError is be raised if this method is called outside of a
         TPC transaction.
@@ -2640,13 +5092,12 @@ class Connection(object):
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         q = "PREPARE TRANSACTION '%s';" % (self._xid[1],)
-        yield from self.execute(self._cursor, q, None)
+        await self.execute(self._cursor, q, None)
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def tpc_commit(self, xid=None):
+    async def tpc_commit(self, xid=None):
         """Coroutine. When called with no arguments, .tpc_commit() commits a TPC
         transaction previously prepared with .tpc_prepare().
 
@@ -2664,7 +5115,7 @@ class Connection(object):
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         if xid is None:
             xid = self._xid
 
@@ -2675,20 +5126,19 @@ class Connection(object):
         try:
             previous_autocommit_mode = self.autocommit
             self.autocommit = True
-            if xid in self.tpc_recover():
-                yield from self.execute(
+            if xid in await self.tpc_recover():
+                await self.execute(
                     self._cursor, "COMMIT PREPARED '%s';" % (xid[1], ),
                     None)
             else:
                 # a single-phase commit
-                yield from self.commit()
+                await self.commit()
         finally:
             self.autocommit = previous_autocommit_mode
         self._xid = None
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def tpc_rollback(self, xid=None):
+    async def tpc_rollback(self, xid=None):
         """Coroutine. When called with no arguments, .tpc_rollback() rolls back a TPC
         transaction. It may be called before or after .tpc_prepare().
 
@@ -2702,7 +5152,7 @@ class Connection(object):
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         if xid is None:
             xid = self._xid
 
@@ -2713,34 +5163,36 @@ class Connection(object):
         try:
             previous_autocommit_mode = self.autocommit
             self.autocommit = True
-            if xid in self.tpc_recover():
+            if xid in await self.tpc_recover():
                 # a two-phase rollback
-                yield from self.execute(
+                await self.execute(
                     self._cursor, "ROLLBACK PREPARED '%s';" % (xid[1],),
                     None)
             else:
                 # a single-phase rollback
-                yield from self.rollback()
+                await self.rollback()
         finally:
             self.autocommit = previous_autocommit_mode
         self._xid = None
 
     @public_coroutine_decorator
-    @asyncio.coroutine
-    def tpc_recover(self):
+    async def tpc_recover(self):
         """Coroutine. Returns a list of pending transaction IDs suitable for use with
         .tpc_commit(xid) or .tpc_rollback(xid).
 
         This function is part of the `DBAPI 2.0 specification
         <http://www.python.org/dev/peps/pep-0249/>`_.
         """
-        yield from self._check_sane()
+        await self._check_sane()
         try:
             previous_autocommit_mode = self.autocommit
             self.autocommit = True
-            curs = yield from self.cursor()
-            yield from curs.execute("select gid FROM pg_prepared_xacts")
-            return [self.xid(0, row[0], '') for row in curs]
+            curs = await self.cursor()
+            await curs.execute("select gid FROM pg_prepared_xacts")
+            xids = []
+            async for row in curs:
+                xids.append(self.xid(0, row[0], ''))
+            return xids
         finally:
             self.autocommit = previous_autocommit_mode
 
@@ -2756,8 +5208,7 @@ class Connection(object):
         
 
     #not a wrapper, this isn't a public facing call
-    @asyncio.coroutine
-    def _check_sane(self):
+    async def _check_sane(self):
         if self.closed:
             raise InterfaceError("connection is closed")
 
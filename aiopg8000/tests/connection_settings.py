@@ -40,16 +40,70 @@ except KeyError:
 db_connect0 = eval(os.environ[TEST_NAME])
 
 
+# The tests share one event loop, as the connection made in setUp is used by
+# the test and closed in tearDown.
+loop = asyncio.new_event_loop()
+asyncio.set_event_loop(loop)
+
+
 #from http://stackoverflow.com/a/23036785/586784
 def async_test(f):
     def wrapper(*args, **kwargs):
-        coro = asyncio.coroutine(f)
-        future = coro(*args, **kwargs)
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(future)
+        loop.run_until_complete(f(*args, **kwargs))
     return wrapper
 
-def stream_generator():
-    return (yield from asyncio.open_connection(host=db_connect0['host'], port=db_connect0['port'], ssl=db_connect0['ssl']))
+async def stream_generator():
+    return await asyncio.open_connection(
+        host=db_connect0['host'], port=db_connect0['port'],
+        ssl=db_connect0['ssl'])
 
 db_connect = dict(user=db_connect0['user'], password=db_connect0['password'], database=db_connect0['database'], stream_generator=stream_generator)
+
+
+async def transport_generator(protocol_factory):
+    return await asyncio.get_event_loop().create_connection(
+        protocol_factory, host=db_connect0['host'], port=db_connect0['port'],
+        ssl=db_connect0['ssl'])
+
+
+class RoundTripCounter(object):
+    """Wraps the stream pair handed to the connection, and counts a round trip
+    each time the client starts writing again after having read from the
+    server.
+    """
+
+    def __init__(self, stream_generator):
+        self.round_trips = 0
+        self._reading = True
+        self._stream_generator = stream_generator
+
+    async def __call__(self):
+        reader, writer = await self._stream_generator()
+        return CountingReader(self, reader), CountingWriter(self, writer)
+
+
+class CountingReader(object):
+    def __init__(self, counter, reader):
+        self._counter = counter
+        self._reader = reader
+
+    def __getattr__(self, name):
+        attr = getattr(self._reader, name)
+        if name in ('read', 'readexactly'):
+            self._counter._reading = True
+        return attr
+
+
+class CountingWriter(object):
+    def __init__(self, counter, writer):
+        self._counter = counter
+        self._writer = writer
+
+    def write(self, data):
+        if self._counter._reading:
+            self._counter.round_trips += 1
+            self._counter._reading = False
+        return self._writer.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._writer, name)
@@ -1,13 +1,10 @@
-import pg8000
-from pg8000.tests.connection_settings import db_connect
+import aiopg8000
+import asyncio
+from aiopg8000.tests.connection_settings import db_connect, RoundTripCounter
 import time
-import warnings
-from contextlib import closing
 from decimal import Decimal
 
 
-whole_begin_time = time.time()
-
 tests = (
         ("cast(id / 100 as int2)", 'int2'),
         ("cast(id as int4)", 'int4'),
@@ -20,41 +17,124 @@ tests = (
         ("timestamp '2001-09-28' + id * interval '1 second'", 'timestamp'),
 )
 
-with warnings.catch_warnings(), closing(pg8000.connect(**db_connect)) as db:
-    for txt, name in tests:
-        query = """SELECT {0} AS column1, {0} AS column2, {0} AS column3,
-            {0} AS column4, {0} AS column5, {0} AS column6, {0} AS column7
-            FROM (SELECT generate_series(1, 10000) AS id) AS tbl""".format(txt)
-        cursor = db.cursor()
-        print("Beginning %s test..." % name)
+
+async def round_trips(counter, cursor, query, args=None):
+    before = counter.round_trips
+    await cursor.execute(query, args)
+    await cursor.fetchall()
+    return counter.round_trips - before
+
+
+async def run():
+    whole_begin_time = time.time()
+    kwargs = dict(db_connect)
+    counter = RoundTripCounter(kwargs.pop('stream_generator'))
+    db = await aiopg8000.connect(stream_generator=counter, **kwargs)
+    try:
+        for txt, name in tests:
+            query = """SELECT {0} AS column1, {0} AS column2, {0} AS column3,
+                {0} AS column4, {0} AS column5, {0} AS column6,
+                {0} AS column7
+                FROM (SELECT generate_series(1, 10000) AS id) AS tbl""".format(
+                txt)
+            cursor = await db.cursor()
+            print("Beginning %s test..." % name)
+            for i in range(1, 5):
+                begin_time = time.time()
+                await cursor.execute(query)
+                await cursor.fetchall()
+                end_time = time.time()
+                print("Attempt %s - %s seconds." % (i, end_time - begin_time))
+        await db.commit()
+        cursor = await db.cursor()
+        await cursor.execute(
+            "CREATE TEMPORARY TABLE t1 (f1 serial primary key, "
+            "f2 bigint not null, f3 varchar(50) null, f4 bool)")
+        await db.commit()
+        params = [(Decimal('7.4009'), 'season of mists...', True)] * 1000
+        print("Beginning executemany test...")
         for i in range(1, 5):
             begin_time = time.time()
-            cursor.execute(query)
-            for row in cursor:
-                pass
+            await cursor.executemany(
+                "insert into t1 (f2, f3, f4) values (%s, %s, %s)", params)
+            await db.commit()
             end_time = time.time()
-            print("Attempt %s - %s seconds." % (i, end_time - begin_time))
-    db.commit()
-    cursor = db.cursor()
-    cursor.execute(
-        "CREATE TEMPORARY TABLE t1 (f1 serial primary key, "
-        "f2 bigint not null, f3 varchar(50) null, f4 bool)")
-    db.commit()
-    params = [(Decimal('7.4009'), 'season of mists...', True)] * 1000
-    print("Beginning executemany test...")
-    for i in range(1, 5):
+            print(
+                "Attempt {0} took {1} seconds.".format(
+                    i, end_time - begin_time))
+
+        print("Beginning reuse statements test...")
         begin_time = time.time()
-        cursor.executemany(
-            "insert into t1 (f2, f3, f4) values (%s, %s, %s)", params)
-        db.commit()
-        end_time = time.time()
-        print("Attempt {0} took {1} seconds.".format(i, end_time - begin_time))
-
-    print("Beginning reuse statements test...")
-    begin_time = time.time()
-    for i in range(2000):
-        cursor.execute("select count(*) from t1")
-        cursor.fetchall()
-    print("Took {0} seconds.".format(time.time() - begin_time))
-
-print("Whole time - %s seconds." % (time.time() - whole_begin_time))
+        for i in range(2000):
+            await cursor.execute("select count(*) from t1")
+            await cursor.fetchall()
+        print("Took {0} seconds.".format(time.time() - begin_time))
+        await db.commit()
+
+        print("Beginning round trips test...")
+        # Open the transaction first, so that the "begin transaction" isn't
+        # counted against the statements being measured.
+        await cursor.execute("select 1")
+        await cursor.fetchall()
+        query = "select f1, f2 from t1 where f1 = %s"
+        print(
+            "First execute took {0} round trips.".format(
+                await round_trips(counter, cursor, query, (1,))))
+        print(
+            "Cached execute took {0} round trips.".format(
+                await round_trips(counter, cursor, query, (2,))))
+        await db.commit()
+
+        print("Beginning row decoding test...")
+        # Ten columns of ints, floats and text. The first attempt gets its
+        # rows in text, and the later ones in binary from the cached
+        # statement.
+        query = """SELECT cast(id as int4) AS c1, cast(id as int8) AS c2,
+            cast(id %% 100 as int2) AS c3, cast(-id as int4) AS c4,
+            id / 3.0::float8 AS c5, id * 1.5::float8 AS c6,
+            cast(id as float4) AS c7, 'row ' || id AS c8,
+            N'Static text string' AS c9, md5(id::text) AS c10
+            FROM generate_series(1, %s) AS id"""
+        row_count = 100000
+        for i in range(1, 5):
+            begin_time = time.time()
+            await cursor.execute(query, (row_count,))
+            await cursor.fetchall()
+            end_time = time.time()
+            print(
+                "Attempt {0} - {1:.0f} rows/sec.".format(
+                    i, row_count / (end_time - begin_time)))
+        await db.commit()
+
+        print("Beginning per-execute overhead test...")
+        # A cached statement returning one row, executed one at a time and
+        # then in pipelines of 100, where the cost of the round trips is
+        # shared out and what's left is mostly the client's own overhead.
+        query = "SELECT cast(%s as int4)"
+        execute_count = 20000
+        for i in range(1, 4):
+            begin_time = time.time()
+            for j in range(execute_count):
+                await cursor.execute(query, (j,))
+                await cursor.fetchall()
+            execute_time = time.time() - begin_time
+            begin_time = time.time()
+            for j in range(0, execute_count, 100):
+                pipeline = db.pipeline()
+                for k in range(j, j + 100):
+                    pipeline.execute(query, (k,))
+                await pipeline.sync()
+            pipeline_time = time.time() - begin_time
+            print(
+                "Attempt {0} - {1:.1f} us per execute, {2:.1f} us per "
+                "pipelined execute.".format(
+                    i, execute_time / execute_count * 1e6,
+                    pipeline_time / execute_count * 1e6))
+        await db.commit()
+    finally:
+        await db.yield_close()
+
+    print("Whole time - %s seconds." % (time.time() - whole_begin_time))
+
+
+asyncio.new_event_loop().run_until_complete(run())
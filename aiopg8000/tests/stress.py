@@ -3,13 +3,12 @@ import asyncio
 from aiopg8000.tests.connection_settings import db_connect
 from contextlib import closing
 
-@asyncio.coroutine
-def run():
-    db = yield from aiopg8000.connect(**db_connect)
+async def run():
+    db = await aiopg8000.connect(**db_connect)
     try:
         for i in range(100):
-            cursor = yield from db.cursor()
-            yield from  cursor.execute("""
+            cursor = await db.cursor()
+            await cursor.execute("""
                 SELECT n.nspname as "Schema",
                   pg_catalog.format_type(t.oid, NULL) AS "Name",
                     pg_catalog.obj_description(t.oid, 'pg_type') as "Description"
@@ -25,7 +24,7 @@ def run():
                              AND pg_catalog.pg_type_is_visible(t.oid)
                              ORDER BY 1, 2;""")
     finally:
-        yield from db.close()
+        await db.close()
 
 
 asyncio.get_event_loop().run_until_complete(run())
@@ -20,22 +20,22 @@ class Tests(unittest.TestCase):
         self.assertRaises(pg8000.ProgrammingError, pg8000.connect, **data)
 
     @async_test
-    def testNotify(self):
+    async def testNotify(self):
 
         try:
-            db = yield from pg8000.connect(**db_connect)
+            db = await pg8000.connect(**db_connect)
             self.assertEqual(db.notifies, [])
-            cursor = yield from  db.cursor()
-            yield from cursor.execute("LISTEN test")
-            yield from cursor.execute("NOTIFY test")
-            yield from db.commit()
+            cursor = await db.cursor()
+            await cursor.execute("LISTEN test")
+            await cursor.execute("NOTIFY test")
+            await db.commit()
 
-            yield from cursor.execute("VALUES (1, 2), (3, 4), (5, 6)")
+            await cursor.execute("VALUES (1, 2), (3, 4), (5, 6)")
             self.assertEqual(len(db.notifies), 1)
             self.assertEqual(db.notifies[0][1], "test")
         finally:
-            yield from cursor.close()
-            yield from db.close()
+            await cursor.close()
+            await db.close()
 
     # This requires a line in pg_hba.conf that requires md5 for the database
     # pg8000_md5
@@ -119,29 +119,29 @@ class Tests(unittest.TestCase):
 
     def testBrokenPipe(self):
         @async_test
-        def wrapper():
+        async def wrapper():
             d1 = None
             d2 = None
             try:
-                db1 = yield from pg8000.connect(**db_connect)
-                db2 = yield from pg8000.connect(**db_connect)
+                db1 = await pg8000.connect(**db_connect)
+                db2 = await pg8000.connect(**db_connect)
 
-                cur1 = yield from db1.cursor()
-                cur2 = yield from db2.cursor()
+                cur1 = await db1.cursor()
+                cur2 = await db2.cursor()
 
-                yield from cur1.execute("select pg_backend_pid()")
-                pid1 = (yield from cur1.fetchone())[0]
+                await cur1.execute("select pg_backend_pid()")
+                pid1 = (await cur1.fetchone())[0]
 
 
-                yield from cur2.execute("select pg_terminate_backend(%s)", (pid1,))
+                await cur2.execute("select pg_terminate_backend(%s)", (pid1,))
 
                 #should throw here
-                yield from cur1.execute("select 1")
+                await cur1.execute("select 1")
 
-                yield from d1.close()
+                await d1.close()
             finally:
-                yield from cur2.close()
-                yield from db2.close()
+                await cur2.close()
+                await db2.close()
 
         self.assertRaises(pg8000.OperationalError, wrapper)
 
@@ -6,210 +6,209 @@ import datetime
 from .connection_settings import db_connect, async_test
 from sys import exc_info
 from aiopg8000.six import b, IS_JYTHON
-from distutils.version import LooseVersion
 import asyncio
 
 
 # DBAPI compatible interface tests
 class Tests(unittest.TestCase):
     @async_test
-    def setUp(self):
-        self.db = yield from aiopg8000.connect(**db_connect)
+    async def setUp(self):
+        self.db = await aiopg8000.connect(**db_connect)
         # Jython 2.5.3 doesn't have a time.tzset() so skip
         if not IS_JYTHON:
             os.environ['TZ'] = "UTC"
             #time.tzset()
 
         try:
-            c = yield from self.db.cursor()
+            c = await self.db.cursor()
             try:
-                yield from c.execute("DROP TABLE t1")
+                await c.execute("DROP TABLE t1")
             except aiopg8000.DatabaseError:
                 e = exc_info()[1]
                 # the only acceptable error is:
                 self.assertEqual(e.args[1], '42P01')  # table does not exist
-                yield from self.db.rollback()
-            yield from c.execute(
+                await self.db.rollback()
+            await c.execute(
                 "CREATE TEMPORARY TABLE t1 "
                 "(f1 int primary key, f2 int not null, f3 varchar(50) null)")
-            yield from c.execute(
+            await c.execute(
                 "INSERT INTO t1 (f1, f2, f3) VALUES (%s, %s, %s)",
                 (1, 1, None))
-            yield from c.execute(
+            await c.execute(
                 "INSERT INTO t1 (f1, f2, f3) VALUES (%s, %s, %s)",
                 (2, 10, None))
-            yield from c.execute(
+            await c.execute(
                 "INSERT INTO t1 (f1, f2, f3) VALUES (%s, %s, %s)",
                 (3, 100, None))
-            yield from c.execute(
+            await c.execute(
                 "INSERT INTO t1 (f1, f2, f3) VALUES (%s, %s, %s)",
                 (4, 1000, None))
-            yield from c.execute(
+            await c.execute(
                 "INSERT INTO t1 (f1, f2, f3) VALUES (%s, %s, %s)",
                 (5, 10000, None))
-            yield from self.db.commit()
+            await self.db.commit()
         finally:
-            yield from c.yield_close()
+            await c.yield_close()
 
     @async_test
-    def tearDown(self):
-        yield from self.db.yield_close()
+    async def tearDown(self):
+        await self.db.yield_close()
 
     @async_test
-    def testParallelQueries(self):
+    async def testParallelQueries(self):
         try:
-            c1 = yield from self.db.cursor()
-            c2 = yield from self.db.cursor()
+            c1 = await self.db.cursor()
+            c2 = await self.db.cursor()
 
-            yield from c1.execute("SELECT f1, f2, f3 FROM t1")
+            await c1.execute("SELECT f1, f2, f3 FROM t1")
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-                yield from c2.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > %s", (f1,))
+                await c2.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > %s", (f1,))
                 while 1:
-                    row = yield from c2.fetchone()
+                    row = await c2.fetchone()
                     if row is None:
                         break
                     f1, f2, f3 = row
         finally:
-            yield from c1.yield_close()
-            yield from c2.yield_close()
+            await c1.yield_close()
+            await c2.yield_close()
 
-        yield from self.db.rollback()
+        await self.db.rollback()
 
     @async_test
-    def testRollback(self):
+    async def testRollback(self):
         try:
             aiopg8000.paramstyle = "pyformat"
-            c = yield from self.db.cursor()
+            c = await self.db.cursor()
 
-            yield from c.execute("SELECT f1, f2, f3 FROM t1 LIMIT 1")
+            await c.execute("SELECT f1, f2, f3 FROM t1 LIMIT 1")
 
-            f1,f2_0,f3 = yield from c.fetchone()
+            f1,f2_0,f3 = await c.fetchone()
 
             
             f2_1 = f2_0 + 1
 
 
-            yield from c.execute("UPDATE t1 SET f2=%(f2)s WHERE f1=%(f1)s", {'f1': f1, 'f2': f2_1})
+            await c.execute("UPDATE t1 SET f2=%(f2)s WHERE f1=%(f1)s", {'f1': f1, 'f2': f2_1})
 
-            yield from c.execute("SELECT f2 FROM t1 WHERE f1=%(f1)s", {'f1': f1})
+            await c.execute("SELECT f2 FROM t1 WHERE f1=%(f1)s", {'f1': f1})
 
-            f2_2, = yield from c.fetchone()
+            f2_2, = await c.fetchone()
 
             self.assertEqual(f2_1,f2_2)
 
-            yield from self.db.rollback()
+            await self.db.rollback()
 
-            yield from c.execute("SELECT f2 FROM t1 WHERE f1=%(f1)s", {'f1': f1})
+            await c.execute("SELECT f2 FROM t1 WHERE f1=%(f1)s", {'f1': f1})
 
-            f2_3, = yield from c.fetchone()
+            f2_3, = await c.fetchone()
 
             self.assertEqual(f2_0,f2_3)
 
         finally:
-            yield from c.yield_close()
+            await c.yield_close()
 
     @async_test
-    def testQmark(self):
+    async def testQmark(self):
         orig_paramstyle = aiopg8000.paramstyle
         try:
             aiopg8000.paramstyle = "qmark"
-            c1 = yield from self.db.cursor()
-            yield from c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > ?", (3,))
+            c1 = await self.db.cursor()
+            await c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > ?", (3,))
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-            yield from self.db.rollback()
+            await self.db.rollback()
         finally:
             aiopg8000.paramstyle = orig_paramstyle
-            yield from c1.yield_close()
+            await c1.yield_close()
 
     @async_test
-    def testNumeric(self):
+    async def testNumeric(self):
         orig_paramstyle = aiopg8000.paramstyle
         try:
             aiopg8000.paramstyle = "numeric"
-            c1 = yield from self.db.cursor()
-            yield from c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > :1", (3,))
+            c1 = await self.db.cursor()
+            await c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > :1", (3,))
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-            yield from self.db.rollback()
+            await self.db.rollback()
         finally:
             aiopg8000.paramstyle = orig_paramstyle
-            yield from c1.yield_close()
+            await c1.yield_close()
 
     @async_test
-    def testNamed(self):
+    async def testNamed(self):
         orig_paramstyle = aiopg8000.paramstyle
         try:
             aiopg8000.paramstyle = "named"
-            c1 = yield from self.db.cursor()
-            yield from c1.execute(
+            c1 = await self.db.cursor()
+            await c1.execute(
                 "SELECT f1, f2, f3 FROM t1 WHERE f1 > :f1", {"f1": 3})
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-            yield from self.db.rollback()
+            await self.db.rollback()
         finally:
             aiopg8000.paramstyle = orig_paramstyle
-            yield from c1.yield_close()
+            await c1.yield_close()
 
     @async_test
-    def testFormat(self):
+    async def testFormat(self):
         orig_paramstyle = aiopg8000.paramstyle
         try:
             aiopg8000.paramstyle = "format"
-            c1 = yield from self.db.cursor()
-            yield from c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > %s", (3,))
+            c1 = await self.db.cursor()
+            await c1.execute("SELECT f1, f2, f3 FROM t1 WHERE f1 > %s", (3,))
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-            yield from self.db.commit()
+            await self.db.commit()
         finally:
             aiopg8000.paramstyle = orig_paramstyle
-            yield from c1.yield_close()
+            await c1.yield_close()
 
     @async_test
-    def testPyformat(self):
+    async def testPyformat(self):
         orig_paramstyle = aiopg8000.paramstyle
         try:
             aiopg8000.paramstyle = "pyformat"
-            c1 = yield from self.db.cursor()
-            yield from c1.execute(
+            c1 = await self.db.cursor()
+            await c1.execute(
                 "SELECT f1, f2, f3 FROM t1 WHERE f1 > %(f1)s", {"f1": 3})
             while 1:
-                row = yield from c1.fetchone()
+                row = await c1.fetchone()
                 if row is None:
                     break
                 f1, f2, f3 = row
-            yield from self.db.commit()
+            await self.db.commit()
         finally:
             aiopg8000.paramstyle = orig_paramstyle
-            yield from c1.yield_close()
+            await c1.yield_close()
 
     @async_test
-    def testArraysize(self):
+    async def testArraysize(self):
         try:
-            c1 = yield from self.db.cursor()
+            c1 = await self.db.cursor()
             c1.arraysize = 3
-            yield from c1.execute("SELECT * FROM t1")
-            retval = yield from c1.fetchmany()
+            await c1.execute("SELECT * FROM t1")
+            retval = await c1.fetchmany()
             self.assertEqual(len(retval), c1.arraysize)
         finally:
-            yield from c1.yield_close()
-        yield from self.db.commit()
+            await c1.yield_close()
+        await self.db.commit()
 
     def testDate(self):
         val = aiopg8000.Date(2001, 2, 3)
@@ -250,67 +249,67 @@ class Tests(unittest.TestCase):
         self.assertTrue(isinstance(v, aiopg8000.BINARY))
 
     @async_test
-    def testRowCount(self):
+    async def testRowCount(self):
         try:
-            c1 = yield from self.db.cursor()
-            yield from c1.execute("SELECT * FROM t1")
+            c1 = await self.db.cursor()
+            await c1.execute("SELECT * FROM t1")
 
             # Before PostgreSQL 9 we don't know the row count for a select
-            if self.db._server_version > LooseVersion('8.0.0'):
+            if self.db._server_version > (8, 0):
                 self.assertEqual(5, c1.rowcount)
 
-            yield from c1.execute("UPDATE t1 SET f3 = %s WHERE f2 > 101", ("Hello!",))
+            await c1.execute("UPDATE t1 SET f3 = %s WHERE f2 > 101", ("Hello!",))
             self.assertEqual(2, c1.rowcount)
 
-            yield from c1.execute("DELETE FROM t1")
+            await c1.execute("DELETE FROM t1")
             self.assertEqual(5, c1.rowcount)
         finally:
-            yield from c1.yield_close()
-        yield from self.db.commit()
+            await c1.yield_close()
+        await self.db.commit()
 
     @async_test
-    def testFetchMany(self):
+    async def testFetchMany(self):
         try:
-            cursor = yield from self.db.cursor()
+            cursor = await self.db.cursor()
             cursor.arraysize = 2
-            yield from cursor.execute("SELECT * FROM t1")
-            self.assertEqual(2, len((yield from cursor.fetchmany())))
-            self.assertEqual(2, len((yield from cursor.fetchmany())))
-            self.assertEqual(1, len((yield from cursor.fetchmany())))
-            self.assertEqual(0, len((yield from cursor.fetchmany())))
+            await cursor.execute("SELECT * FROM t1")
+            self.assertEqual(2, len(await cursor.fetchmany()))
+            self.assertEqual(2, len(await cursor.fetchmany()))
+            self.assertEqual(1, len(await cursor.fetchmany()))
+            self.assertEqual(0, len(await cursor.fetchmany()))
         finally:
-            yield from cursor.yield_close()
-        yield from self.db.commit()
+            await cursor.yield_close()
+        await self.db.commit()
 
     @async_test
-    def testIterator(self):
+    async def testIterator(self):
         from warnings import filterwarnings
         filterwarnings("ignore", "DB-API extension cursor.next()")
         filterwarnings("ignore", "DB-API extension cursor.__iter__()")
 
         try:
-            cursor = yield from self.db.cursor()
-            yield from cursor.execute("SELECT * FROM t1 ORDER BY f1")
+            cursor = await self.db.cursor()
+            await cursor.execute("SELECT * FROM t1 ORDER BY f1")
             f1 = 0
             for row in cursor:
                 next_f1 = row[0]
                 assert next_f1 > f1
                 f1 = next_f1
         except:
-            yield from cursor.yield_close()
+            await cursor.yield_close()
 
-        yield from self.db.commit()
+        await self.db.commit()
 
     # Vacuum can't be run inside a transaction, so we need to turn
     # autocommit on.
     @async_test
-    def testVacuum(self):
+    async def testVacuum(self):
         self.db.autocommit = True
         try:
-            cursor = yield from self.db.cursor()
-            yield from cursor.execute("vacuum")
+            cursor = await self.db.cursor()
+            await cursor.execute("vacuum")
         finally:
-            yield from cursor.yield_close()
+            await cursor.yield_close()
 
     # If autocommit is on and we do an operation that returns more rows than
     # the cache holds, make sure exception raised.
@@ -318,16 +317,18 @@ class Tests(unittest.TestCase):
     def testAutocommitMaxRows(self):
 
         @async_test
-        def test_wrapper():
+        async def test_wrapper():
             self.db.autocommit = True
             try:
-                cursor = yield from  self.db.cursor()
+                cursor = await self.db.cursor()
 
-                yield from cursor.execute("select generate_series(1, " +
-                                str(aiopg8000.core.Connection._row_cache_size + 1) + ")")
+                # With a parameter, so that it doesn't go as a simple query.
+                await cursor.execute(
+                    "select generate_series(1, %s)",
+                    (self.db.fetch_size + 1,))
 
             finally:
-                yield from cursor.yield_close()
+                await cursor.yield_close()
 
         self.assertRaises(aiopg8000.InterfaceError, test_wrapper)
 if __name__ == "__main__":
@@ -0,0 +1,1187 @@
+import unittest
+import asyncio
+from array import array
+from itertools import product
+import aiopg8000
+import datetime
+from decimal import Decimal
+from uuid import UUID
+from .connection_settings import (
+    db_connect, async_test, RoundTripCounter, transport_generator)
+
+
+# Tests of how many round trips to the server each operation costs, and that
+# the server side objects created along the way are cleaned up.
+class Tests(unittest.TestCase):
+    @async_test
+    async def setUp(self):
+        kwargs = dict(db_connect)
+        self.counter = RoundTripCounter(kwargs.pop('stream_generator'))
+        self.db = await aiopg8000.connect(
+            stream_generator=self.counter, **kwargs)
+
+    @async_test
+    async def tearDown(self):
+        await self.db.yield_close()
+
+    @async_test
+    async def testCachedExecuteRoundTrips(self):
+        try:
+            cursor = await self.db.cursor()
+            await cursor.execute("SELECT cast(%s as int4)", (1,))
+            before = self.counter.round_trips
+            for i in range(10):
+                await cursor.execute("SELECT cast(%s as int4)", (i,))
+                self.assertEqual(await cursor.fetchall(), ([i],))
+            self.assertEqual(self.counter.round_trips - before, 10)
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testFirstExecuteRoundTrips(self):
+        try:
+            cursor = await self.db.cursor()
+            await cursor.execute("SELECT 1")
+            before = self.counter.round_trips
+            await cursor.execute("SELECT cast(%s as int4) + 1", (1,))
+            self.assertEqual(await cursor.fetchall(), ([2],))
+            self.assertEqual(self.counter.round_trips - before, 1)
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testFirstExecuteTypes(self):
+        # The first execution of a statement receives the results in text,
+        # later ones mostly in binary. They must decode to the same values.
+        values = (
+            ("true", True),
+            ("cast('\\x00ff41' as bytea)", b'\x00\xffA'),
+            ("cast(-12 as int2)", -12),
+            ("cast(123456789012 as int8)", 123456789012),
+            ("cast(1.1 as float4)", 1.100000023841858),
+            ("cast(0.1 as float8)", 0.1),
+            ("ARRAY[[1, 2], [3, NULL]]", [[1, 2], [3, None]]),
+            ("ARRAY['a', 'b c', 'd\"e', NULL]", ['a', 'b c', 'd"e', None]),
+            (
+                "cast('2001-09-28 01:02:03.456' as timestamp)",
+                datetime.datetime(2001, 9, 28, 1, 2, 3, 456000)),
+            (
+                "cast('2001-09-28 01:02:03+05:30' as timestamptz)",
+                datetime.datetime(
+                    2001, 9, 27, 19, 32, 3, tzinfo=aiopg8000.utc)),
+            (
+                "cast('-1 days +02:03:04.5' as interval)",
+                datetime.timedelta(-1, 7384, 500000)),
+            (
+                "cast('1 year 2 mons 3 days' as interval)",
+                aiopg8000.Interval(0, 3, 14)),
+            (
+                "cast('a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11' as uuid)",
+                UUID('a0eebc99-9c0b-4ef8-bb6d-6bb9bd380a11')),
+            ("cast(1.5 as numeric)", Decimal('1.5')),
+        )
+        try:
+            cursor = await self.db.cursor()
+            for expr, value in values:
+                for i in range(2):
+                    await cursor.execute("SELECT " + expr)
+                    self.assertEqual(
+                        await cursor.fetchall(), ([value],))
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testFirstExecuteError(self):
+        try:
+            cursor = await self.db.cursor()
+            for i in range(2):
+                try:
+                    await cursor.execute("SELECT 1 / %s", (0,))
+                    self.fail()
+                except aiopg8000.ProgrammingError:
+                    pass
+                await self.db.rollback()
+
+            await cursor.execute(
+                "SELECT count(*) FROM pg_prepared_statements "
+                "WHERE statement = 'SELECT 1 / $1'")
+            self.assertEqual(await cursor.fetchall(), ([0],))
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testExecuteManyRoundTrips(self):
+        try:
+            cursor = await self.db.cursor()
+            await cursor.execute(
+                "CREATE TEMPORARY TABLE t1 (f1 int primary key, f2 text)")
+            before = self.counter.round_trips
+            await cursor.executemany(
+                "INSERT INTO t1 (f1, f2) VALUES (%s, %s)",
+                [(i, str(i)) for i in range(100)])
+            self.assertEqual(self.counter.round_trips - before, 1)
+            self.assertEqual(cursor.rowcount, 100)
+
+            self.db._executemany_batch_size = 30
+            before = self.counter.round_trips
+            await cursor.executemany(
+                "UPDATE t1 SET f2 = %s WHERE f1 = %s",
+                [(None if i % 2 else 'x', i) for i in range(100)])
+            # A new statement for each of the two parameter types, and then
+            # four batches.
+            self.assertEqual(self.counter.round_trips - before, 5)
+            self.assertEqual(cursor.rowcount, 100)
+
+            await cursor.execute(
+                "SELECT count(*) FROM t1 WHERE f2 IS NULL")
+            self.assertEqual(await cursor.fetchall(), ([50],))
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testExecuteManyError(self):
+        self.db.autocommit = True
+        self.db._executemany_batch_size = 10
+        try:
+            cursor = await self.db.cursor()
+            await cursor.execute(
+                "CREATE TEMPORARY TABLE t1 (f1 int primary key)")
+            try:
+                await cursor.executemany(
+                    "INSERT INTO t1 (f1) VALUES (%s)",
+                    [(i,) for i in range(15)] + [(0,)] + [(20,)])
+                self.fail()
+            except aiopg8000.ProgrammingError:
+                pass
+            self.assertEqual(cursor.rowcount, -1)
+
+            # The first batch is committed, the failed one isn't.
+            await cursor.execute("SELECT count(*) FROM t1")
+            self.assertEqual(await cursor.fetchall(), ([10],))
+        finally:
+            await cursor.yield_close()
+
+    @async_test
+    async def testPortalsClosed(self):
+        try:
+            cursor = await self.db.cursor()
+            for i in range(10):
+                await cursor.execute("SELECT cast(%s as int4)", (i,))
+                await cursor.fetchall()
+            # The count itself is a simple query, which doesn't show up in
+            # pg_cursors.
+            await cursor.execute("SELECT count(*) FROM pg_cursors")
+            self.assertEqual(await cursor.fetchall(), ([0],))
+        finally:
+            await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testSuspendedPortalClosedWithCursor(self):
+        try:
+            c1 = await self.db.cursor()
+            await c1.execute(
+                "SELECT generate_series(1, %s)",
+                (self.db.fetch_size + 1,))
+            await c1.fetchone()
+            await c1.yield_close()
+
+            c2 = await self.db.cursor()
+            await c2.execute("SELECT count(*) FROM pg_cursors")
+            self.assertEqual(await c2.fetchall(), ([0],))
+        finally:
+            await c2.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testSimpleQuery(self):
+        cursor = await self.db.cursor()
+        await cursor.execute("SELECT 1")
+        number = self.db.statement_number
+        before = self.counter.round_trips
+        await cursor.execute(
+            "SELECT cast(1 as int8), 'a', 1.5, '%%', null")
+        self.assertEqual(
+            await cursor.fetchall(),
+            ([1, 'a', Decimal('1.5'), '%', None],))
+        self.assertEqual(self.counter.round_trips - before, 1)
+        self.assertEqual(self.db.statement_number, number)
+
+        # Several statements, the rows of the last one are kept.
+        await cursor.execute(
+            "CREATE TEMPORARY TABLE t1 (f1 int); "
+            "INSERT INTO t1 VALUES (1), (2); "
+            "SELECT 'x'; SELECT f1 FROM t1 ORDER BY f1")
+        self.assertEqual(await cursor.fetchall(), ([1], [2]))
+        self.assertEqual(cursor.description[0][0], b'f1')
+        await cursor.yield_close()
+        await self.db.rollback()
+
+        # Without the simple query protocol, prepared statements are made for
+        # both the begin transaction and the select.
+        self.db.use_simple_query = False
+        cursor = await self.db.cursor()
+        await cursor.execute("SELECT 1")
+        self.assertEqual(self.db.statement_number, number + 2)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testSimpleQueryAutocommit(self):
+        # All the rows are received at once, so there's no portal to lose
+        # when the transaction ends.
+        self.db.autocommit = True
+        try:
+            cursor = await self.db.cursor()
+            await cursor.execute(
+                "SELECT generate_series(1, " +
+                str(self.db.fetch_size + 1) + ")")
+            self.assertEqual(
+                len(await cursor.fetchall()),
+                self.db.fetch_size + 1)
+            await cursor.yield_close()
+        finally:
+            self.db.autocommit = False
+
+    @async_test
+    async def testSimpleQueryStreaming(self):
+        # A cursor that asks for its rows in batches gets them through a
+        # portal, even for a statement without parameters.
+        sql = "SELECT generate_series(1, 1000)"
+        for name, value in (
+                ('fetch_size', 10), ('fetch_size', None), ('prefetch', True)):
+            cursor = await self.db.cursor()
+            setattr(cursor, name, value)
+            await cursor.execute(sql)
+            self.assertTrue(cursor.portal_suspended)
+            self.assertLess(len(cursor._cached_rows), 1000)
+            rows = [row async for row in cursor]
+            self.assertEqual(rows, [[i] for i in range(1, 1001)])
+            await cursor.yield_close()
+
+        # A fetch_size of 0 asks for all the rows at once.
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 0
+        await cursor.execute(sql)
+        self.assertTrue(cursor.ps['simple_query'])
+        self.assertEqual(len(cursor._cached_rows), 1000)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+        # With autocommit on, the portal would be closed after the first
+        # batch.
+        self.db.autocommit = True
+        try:
+            cursor = await self.db.cursor()
+            cursor.fetch_size = 10
+            await cursor.execute(sql)
+            self.assertEqual(len(await cursor.fetchall()), 1000)
+            await cursor.yield_close()
+        finally:
+            self.db.autocommit = False
+
+    @async_test
+    async def testStatementCache(self):
+        self.db.statement_cache_size = 3
+        cursor = await self.db.cursor()
+        for i in range(10):
+            await cursor.execute(
+                "SELECT cast(%s as int4) + " + str(i), (1,))
+        for i in range(2):
+            await cursor.execute("SELECT cast(%s as int4) + 9", (1,))
+        info = self.db.statement_cache_info()
+        self.assertEqual(
+            [(e.operation, e.hits) for e in info], [
+                ("SELECT cast(%s as int4) + 7", 0),
+                ("SELECT cast(%s as int4) + 8", 0),
+                ("SELECT cast(%s as int4) + 9", 2)])
+
+        # The Close messages of the evicted statements have gone out ahead of
+        # this query, without a round trip of their own.
+        before = self.counter.round_trips
+        await cursor.execute(
+            "SELECT count(*) FROM pg_prepared_statements")
+        self.assertEqual(await cursor.fetchall(), ([3],))
+        self.assertEqual(self.counter.round_trips - before, 1)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testStatementEvictedWithOpenPortal(self):
+        self.db.statement_cache_size = 1
+        c1 = await self.db.cursor()
+        await c1.execute(
+            "SELECT generate_series(1, %s)",
+            (self.db.fetch_size * 2,))
+        c2 = await self.db.cursor()
+        await c2.execute("SELECT cast(%s as int4)", (1,))
+        await c2.execute("SELECT cast(%s as int4)", (1,))
+
+        # The statement of c1 has left the cache, but it can still be read.
+        rows = await c1.fetchall()
+        self.assertEqual(
+            len(rows), self.db.fetch_size * 2)
+        await c2.execute(
+            "SELECT count(*) FROM pg_prepared_statements")
+        self.assertEqual(await c2.fetchall(), ([1],))
+        await c1.yield_close()
+        await c2.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testPrepareThreshold(self):
+        self.db.prepare_threshold = 3
+        cursor = await self.db.cursor()
+        await cursor.execute("SELECT 1")
+        number = self.db.statement_number
+        for i in range(4):
+            before = self.counter.round_trips
+            await cursor.execute("SELECT cast(%s as int4) + 1", (i,))
+            self.assertEqual(await cursor.fetchall(), ([i + 1],))
+            self.assertEqual(self.counter.round_trips - before, 1)
+            self.assertEqual(
+                self.db.statement_number, number + (0 if i < 2 else 1))
+        self.assertEqual(
+            [(e.operation, e.hits) for e in self.db.statement_cache_info()],
+            [("SELECT cast(%s as int4) + 1", 1)])
+
+        # A portal of the unnamed statement outlasts the statement.
+        c2 = await self.db.cursor()
+        await c2.execute(
+            "SELECT generate_series(1, %s)",
+            (self.db.fetch_size * 2,))
+        await cursor.execute("SELECT cast(%s as int8)", (1,))
+        self.assertEqual(
+            len(await c2.fetchall()),
+            self.db.fetch_size * 2)
+        await c2.yield_close()
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testPrepare(self):
+        cursor = await self.db.cursor()
+        await cursor.execute(
+            "CREATE TEMPORARY TABLE t1 (f1 int, f2 text)")
+        stmt = await self.db.prepare(
+            "INSERT INTO t1 (f1, f2) VALUES (%s, %s)")
+        self.assertEqual(stmt.parameter_types, (23, 25))
+        self.assertEqual(stmt.description, None)
+        before = self.counter.round_trips
+        self.assertEqual(
+            await stmt.executemany([(i, str(i)) for i in range(100)]),
+            100)
+        self.assertEqual(self.counter.round_trips - before, 1)
+
+        stmt2 = await self.db.prepare(
+            "SELECT f1, f2 FROM t1 WHERE f1 > %s ORDER BY f1")
+        self.assertEqual(stmt2.description[0][:2], (b'f1', 23))
+        for i in range(3):
+            before = self.counter.round_trips
+            self.assertEqual(
+                await stmt2.fetch(96 + i),
+                [[j, str(j)] for j in range(97 + i, 100)])
+            self.assertEqual(self.counter.round_trips - before, 1)
+
+        for args, error in (
+                (('a',), aiopg8000.DataError),
+                ((2 ** 40,), aiopg8000.DataError),
+                ((1, 2), aiopg8000.ProgrammingError)):
+            try:
+                await stmt2.fetch(*args)
+            except error:
+                pass
+            else:
+                self.fail("expected a " + error.__name__)
+        self.assertEqual(await stmt2.fetch(98), [[99, '99']])
+
+        stmt.close()
+        stmt2.close()
+        try:
+            await stmt2.fetch(1)
+        except aiopg8000.InterfaceError:
+            pass
+        else:
+            self.fail("expected an InterfaceError")
+        await cursor.execute(
+            "SELECT count(*) FROM pg_prepared_statements")
+        self.assertEqual(await cursor.fetchall(), ([0],))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testDescribedParameterTypes(self):
+        cursor = await self.db.cursor()
+        await cursor.execute(
+            "CREATE TEMPORARY TABLE t1 (f1 int4, f2 float8, f3 text)")
+        sql = "INSERT INTO t1 VALUES (%s, %s, %s)"
+        await cursor.execute(sql, (1, 2, 'a'))
+        cache = self.db._caches[aiopg8000.paramstyle]
+        ps = cache['ps'][(705, 705, 705), sql]
+        self.assertEqual(ps['param_oids'], (23, 701, 25))
+        self.assertEqual(
+            ps['param_funcs'][:2],
+            (aiopg8000.core.i_pack, aiopg8000.core.d_pack))
+
+        # Values that don't suit the binary types go as text, the same as
+        # the first time.
+        await cursor.execute(sql, (2, 3.5, 'b'))
+        await cursor.execute(sql, ('3', 4, 5))
+        await cursor.executemany(sql, [(4, 5, 'c'), (5, 6, 'd')])
+        try:
+            await cursor.execute(sql, (2 ** 40, 1, 'e'))
+        except aiopg8000.ProgrammingError:
+            pass
+        else:
+            self.fail("expected a ProgrammingError")
+        await self.db.rollback()
+
+        await cursor.execute(
+            "CREATE TEMPORARY TABLE t1 (f1 int4, f2 float8, f3 text)")
+        await cursor.executemany(
+            sql, [(1, 2, 'a'), ('2', 3, 4), (3, 4.5, 'c')])
+        await cursor.execute("SELECT * FROM t1 ORDER BY f1")
+        self.assertEqual(
+            await cursor.fetchall(),
+            ([1, 2.0, 'a'], [2, 3.0, '4'], [3, 4.5, 'c']))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testDescribedBoolParam(self):
+        # A str for a bool parameter is still sent in text once the
+        # statement has been described.
+        cursor = await self.db.cursor()
+        await cursor.execute("CREATE TEMPORARY TABLE t1 (f1 bool)")
+        await cursor.execute("INSERT INTO t1 VALUES (true)")
+        for i in range(2):
+            await cursor.execute("UPDATE t1 SET f1 = %s", ('false',))
+            await cursor.execute("SELECT f1 FROM t1")
+            self.assertEqual(await cursor.fetchall(), ([False],))
+            await cursor.execute("UPDATE t1 SET f1 = true")
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testBindStruct(self):
+        cursor = await self.db.cursor()
+        sql = "SELECT %s::int2, %s::int4, %s::int8, %s::float8"
+        await cursor.execute(sql, (1, 2, 3, 4))
+        cache = self.db._caches[aiopg8000.paramstyle]
+        ps = cache['ps'][(705, 705, 705, 705), sql]
+        self.assertEqual(ps['bind_struct'].size, 4 * 4 + 2 + 4 + 8 + 8)
+        for args in (
+                (5, -6, 2 ** 40, 0.5),
+                (None, 1, None, 2.5),
+                ('7', 1, 2, 3)):
+            await cursor.execute(sql, args)
+            self.assertEqual(
+                await cursor.fetchall(),
+                ([None if v is None else int(v) if i < 3 else v
+                  for i, v in enumerate(args)],))
+
+        # A bool is packed by bool_send, which isn't part of a template.
+        sql = "SELECT %s::int4, %s::bool"
+        for args in ((1, True), (2, False)):
+            await cursor.execute(sql, args)
+            self.assertEqual(await cursor.fetchall(), (list(args),))
+        self.assertIsNone(cache['ps'][(705, 16), sql]['bind_struct'])
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testBindOverflow(self):
+        # A value that's too big for the binary encoding of a parameter is
+        # sent in text instead, for the server to say it's out of range.
+        class Big(float):
+            pass
+        self.db.py_types[Big] = self.db.py_types[int]
+        try:
+            cursor = await self.db.cursor()
+            sql = "SELECT %s::float4, %s::int4"
+            await cursor.execute(sql, (1, 2))
+            ps = cursor.ps
+            self.assertIsNotNone(ps['bind_struct'])
+            for args in ((Big(1e300), 3), (Big(1e300), None)):
+                try:
+                    await cursor.execute(sql, args)
+                    self.fail("expected an out of range error")
+                except aiopg8000.ProgrammingError as e:
+                    self.assertIn('22003', e.args)
+                await self.db.rollback()
+                self.assertEqual(ps['portals'], 0)
+            await cursor.execute(sql, (Big(2.5), 4))
+            self.assertEqual(await cursor.fetchall(), ([2.5, 4],))
+        finally:
+            del self.db.py_types[Big]
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testRowDecoder(self):
+        cursor = await self.db.cursor()
+        sql = "SELECT %s::int2, %s::int4, %s::text, %s::int8, " \
+            "%s::float4, %s::float8, %s::bool"
+        rows = (
+            [1, 2, 'three', 4, 5.5, 6.25, True],
+            [None, -2, None, 2 ** 40, None, -0.5, False],
+            [7, 8, '', 9, 1.0, None, None])
+        for row in rows * 2:
+            await cursor.execute(sql, row)
+            self.assertEqual(await cursor.fetchall(), (row,))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testFetchSize(self):
+        cursor = await self.db.cursor()
+        self.assertEqual(cursor.fetch_size, self.db.fetch_size)
+        cursor.fetch_size = 7
+        await cursor.execute("SELECT generate_series(1, %s)", (1000,))
+        before = self.counter.round_trips
+        self.assertEqual(len(await cursor.fetchmany(7)), 7)
+        self.assertEqual(self.counter.round_trips - before, 0)
+        self.assertEqual(await cursor.fetchone(), [8])
+        self.assertEqual(self.counter.round_trips - before, 1)
+
+        # The rest of the rows are fetched together.
+        rows = await cursor.fetchall()
+        self.assertEqual(rows[0], [9])
+        self.assertEqual(len(rows), 1000 - 8)
+        self.assertEqual(self.counter.round_trips - before, 2)
+        self.assertEqual(await cursor.fetchall(), ())
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testAdaptiveFetchSize(self):
+        cursor = await self.db.cursor()
+        cursor.fetch_size = None
+        sql = "SELECT id, repeat('x', %s) FROM generate_series(1, 5000) AS id"
+
+        # Narrow rows are fetched in batches that double in size.
+        await cursor.execute(sql, (10,))
+        before = self.counter.round_trips
+        count = 0
+        while (await cursor.fetchone()) is not None:
+            count += 1
+        self.assertEqual(count, 5000)
+        # 100 + 200 + 400 + 800 + 1600 + 3200 rows
+        self.assertEqual(self.counter.round_trips - before, 5)
+
+        # Wide rows are fetched in batches that stay under the byte budget.
+        self.db.fetch_buffer_size = 100000
+        await cursor.execute(sql, (10000,))
+        self.assertLessEqual(cursor._adaptive_fetch_size, 10)
+        before = self.counter.round_trips
+        self.assertEqual(len(await cursor.fetchmany(500)), 500)
+        self.assertGreaterEqual(self.counter.round_trips - before, 40)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testPrefetch(self):
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 10
+        cursor.prefetch = True
+        await cursor.execute("SELECT generate_series(1, %s)", (1000,))
+
+        # Once fewer than 5 rows are left, the next batch is fetched while
+        # the consumer is busy.
+        self.assertEqual(len(await cursor.fetchmany(6)), 6)
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(cursor._cached_rows), 14)
+
+        # Another statement waits for the prefetch, and the rows keep coming
+        # in order.
+        other = await self.db.cursor()
+        await other.execute("SELECT cast(%s as int4)", (42,))
+        self.assertEqual(await other.fetchall(), ([42],))
+        rows = []
+        while True:
+            row = await cursor.fetchone()
+            if row is None:
+                break
+            rows.append(row[0])
+        self.assertEqual(rows, list(range(7, 1001)))
+
+        # An error from a prefetch is raised when its rows are wanted.
+        await cursor.execute(
+            "SELECT 1 / (20 - id) FROM generate_series(1, %s) AS id", (30,))
+        with self.assertRaises(aiopg8000.ProgrammingError):
+            while (await cursor.fetchone()) is not None:
+                await asyncio.sleep(0)
+        await cursor.yield_close()
+        await other.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testCloseDuringPrefetch(self):
+        # The portal is closed once, by the prefetch, whether the cursor is
+        # closed before or after the prefetch sends its Execute, and whether
+        # the prefetch leaves the portal suspended or reaches the end of the
+        # rows.
+        for count, started in product((1000, 15), (False, True)):
+            cursor = await self.db.cursor()
+            cursor.fetch_size = 10
+            cursor.prefetch = True
+            sql = "SELECT generate_series(1, %s)"
+            await cursor.execute(sql, (count,))
+            ps = cursor.ps
+            close_msg = b'P' + cursor.portal_name_bin
+            self.assertEqual(len(await cursor.fetchmany(6)), 6)
+            if started:
+                await asyncio.sleep(0)
+            self.assertIsNotNone(self.db._prefetch)
+            cursor.close()
+            await self.db._join_prefetch()
+            self.assertEqual(ps['portals'], 0)
+            self.assertEqual(self.db._deferred_closes.count(close_msg), 1)
+        await self.db.rollback()
+
+    @async_test
+    async def testPrefetchConnectionDropped(self):
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 10
+        cursor.prefetch = True
+        await cursor.execute("SELECT generate_series(1, %s)", (1000,))
+        await cursor.execute("SELECT pg_backend_pid()")
+        pid = (await cursor.fetchall())[0][0]
+        await cursor.execute("SELECT generate_series(1, %s)", (1000,))
+
+        # The prefetch finds the connection gone, and closes it from
+        # inside its own task.
+        other = await aiopg8000.connect(**db_connect)
+        try:
+            other_cursor = await other.cursor()
+            await other_cursor.execute(
+                "SELECT pg_terminate_backend(%s)", (pid,))
+        finally:
+            await other.yield_close()
+        self.assertEqual(len(await cursor.fetchmany(6)), 6)
+        with self.assertRaises(aiopg8000.Error):
+            await asyncio.wait_for(cursor.fetchmany(10), 5)
+
+    @async_test
+    async def testAsyncIteration(self):
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 10
+        sql = "SELECT generate_series(1, %s)"
+        await cursor.execute(sql, (95,))
+        before = self.counter.round_trips
+        rows = []
+        async for row in cursor:
+            rows.append(row[0])
+        self.assertEqual(rows, list(range(1, 96)))
+        self.assertEqual(self.counter.round_trips - before, 9)
+
+        # Batches of the rows as they come from the server.
+        await cursor.execute(sql, (95,))
+        sizes = []
+        async for rows in cursor.iter_batches():
+            sizes.append(len(rows))
+        self.assertEqual(sizes, [10] * 9 + [5])
+
+        # Batches of a given size, across the batches from the server.
+        await cursor.execute(sql, (95,))
+        rows = []
+        async for batch in cursor.iter_batches(25):
+            rows.append([row[0] for row in batch])
+        self.assertEqual([len(batch) for batch in rows], [25, 25, 25, 20])
+        self.assertEqual(rows[1][0], 26)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testNamedCursor(self):
+        # A cursor declared WITH HOLD can be read in batches with autocommit
+        # on.
+        self.db.autocommit = True
+        try:
+            cursor = await self.db.cursor("named", hold=True)
+            self.assertEqual(cursor.name, "named")
+            cursor.fetch_size = 10
+            before = self.counter.round_trips
+            await cursor.execute("SELECT generate_series(1, %s)", (95,))
+            self.assertEqual(self.counter.round_trips - before, 2)
+            self.assertEqual(cursor.description[0][1], 23)
+            rows = []
+            async for row in cursor:
+                rows.append(row[0])
+            self.assertEqual(rows, list(range(1, 96)))
+            self.assertEqual(self.counter.round_trips - before, 11)
+
+            # A query that's declared again under the same name replaces the
+            # old cursor, and the cursor is closed once it's been read.
+            await cursor.execute("SELECT generate_series(1, %s)", (15,))
+            await cursor.execute("SELECT 'x'")
+            self.assertEqual(await cursor.fetchall(), (['x'],))
+            other = await self.db.cursor()
+            await other.execute("SELECT name FROM pg_cursors")
+            self.assertEqual(await other.fetchall(), ())
+            with self.assertRaises(aiopg8000.ProgrammingError):
+                await cursor.executemany("SELECT %s", ((1,), (2,)))
+            await cursor.yield_close()
+            await other.yield_close()
+        finally:
+            self.db.autocommit = False
+
+    @async_test
+    async def testRowFactories(self):
+        cursor = await self.db.cursor()
+        sql = "SELECT cast(%s as int4) AS a, 'x' AS \"b c\", 2 AS count"
+        await cursor.execute(sql, (1,))
+        self.assertEqual(await cursor.fetchall(), ([1, 'x', 2],))
+        self.assertIs(cursor.description, cursor.description)
+
+        cursor.row_factory = aiopg8000.tuple_row
+        await cursor.execute(sql, (1,))
+        self.assertEqual(await cursor.fetchone(), (1, 'x', 2))
+
+        cursor.row_factory = aiopg8000.dict_row
+        await cursor.execute(sql, (1,))
+        self.assertEqual(
+            await cursor.fetchmany(5), ({'a': 1, 'b c': 'x', 'count': 2},))
+
+        cursor.row_factory = aiopg8000.namedtuple_row
+        await cursor.execute(sql, (1,))
+        row = (await cursor.fetchall())[0]
+        self.assertEqual((row.a, row[1], row.count), (1, 'x', 2))
+
+        cursor.row_factory = aiopg8000.record_row
+        await cursor.execute(sql, (1,))
+        row = await cursor.fetchone()
+        self.assertEqual(row, (1, 'x', 2))
+        self.assertEqual((row.a, row['b c'], row['count']), (1, 'x', 2))
+        # The column named count doesn't hide the method of tuple.
+        self.assertEqual(row.count(2), 1)
+        self.assertEqual(repr(row), "Record(a=1, b c='x', count=2)")
+
+        # The record class is made once for the statement.
+        await cursor.execute(sql, (3,))
+        self.assertIs(type(await cursor.fetchone()), type(row))
+
+        self.db.row_factory = aiopg8000.record_row
+        try:
+            stmt = await self.db.prepare(sql)
+            self.assertEqual((await stmt.fetch(4))[0].a, 4)
+            stmt.close()
+        finally:
+            self.db.row_factory = None
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testSessionStyles(self):
+        cursor = await self.db.cursor()
+        sql = "SELECT cast(%s as timestamp), cast(%s as timestamptz), " \
+            "cast(%s as interval)"
+        args = ('2001-02-03 04:05:06.5', '2001-02-03 04:05:06+00', '1 day')
+        expected = [
+            datetime.datetime(2001, 2, 3, 4, 5, 6, 500000),
+            datetime.datetime(2001, 2, 3, 4, 5, 6, tzinfo=aiopg8000.utc),
+            datetime.timedelta(1)]
+        await cursor.execute(
+            "SET DateStyle TO 'SQL, DMY'; SET IntervalStyle TO 'iso_8601'")
+
+        # New statements are described first, and their results requested
+        # in binary, as they couldn't be read in text.
+        for i in range(2):
+            before = self.counter.round_trips
+            await cursor.execute(sql, args)
+            self.assertEqual(await cursor.fetchall(), (expected,))
+            self.assertEqual(self.counter.round_trips - before, 2 - i)
+        await cursor.execute("SELECT cast('2001-02-03' as timestamp)")
+        self.assertEqual(
+            await cursor.fetchall(), ([datetime.datetime(2001, 2, 3)],))
+        p = self.db.pipeline()
+        f = p.execute("SELECT cast(%s as interval)", ('1 day 2 hours',))
+        await p.sync()
+        self.assertEqual(
+            await f.result().fetchall(),
+            ([datetime.timedelta(1, 7200)],))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testFloatText(self):
+        # The session's float output is left as it is.
+        cursor = await self.db.cursor()
+        await cursor.execute(
+            "SELECT source FROM pg_settings "
+            "WHERE name = 'extra_float_digits'")
+        self.assertNotEqual(await cursor.fetchall(), (['client'],))
+
+        # A server older than 12 would round floats sent as text, so new
+        # statements are described first.
+        version = self.db._server_version
+        self.db.handle_PARAMETER_STATUS(b'server_version\x0011.9\x00', None)
+        try:
+            sql = "SELECT cast(%s as float8) / 3"
+            for i in range(2):
+                before = self.counter.round_trips
+                await cursor.execute(sql, (1,))
+                self.assertEqual(await cursor.fetchall(), ([1 / 3],))
+                self.assertEqual(self.counter.round_trips - before, 2 - i)
+            await cursor.execute("SELECT cast(1 as float8) / 3")
+            self.assertNotIn('simple_query', cursor.ps)
+            self.assertEqual(await cursor.fetchall(), ([1 / 3],))
+        finally:
+            self.db.handle_PARAMETER_STATUS(
+                b'server_version\x00' +
+                '.'.join(map(str, version)).encode('ascii') + b'\x00', None)
+        self.assertTrue(self.db._text_styles)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    def testTimestampTextRange(self):
+        # Years that a datetime can't hold overflow as in binary.
+        for func, value in (
+                (aiopg8000.core.timestamp_in, b'0044-03-15 12:00:00 BC'),
+                (aiopg8000.core.timestamp_in, b'10000-01-01 00:00:00'),
+                (aiopg8000.core.timestamptz_in, b'0044-03-15 12:00:00+00 BC'),
+                (aiopg8000.core.timestamptz_in, b'10000-01-01 00:00:00-08')):
+            with self.assertRaises(OverflowError):
+                func(value, 0, len(value))
+        self.assertEqual(
+            aiopg8000.core.timestamptz_in(
+                b'0044-03-15 12:00:00+00', 0, 22),
+            datetime.datetime(44, 3, 15, 12, tzinfo=aiopg8000.utc))
+
+    @async_test
+    async def testFetchColumns(self):
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 10
+        sql = "SELECT id, cast(id as float8) / 2, id %% 2 = 0, " \
+            "timestamp '2000-01-01' + id * interval '1 second', " \
+            "case when id %% 7 = 0 then null else id * 10 end, " \
+            "'row ' || id FROM generate_series(1, %s) AS id"
+        # The first time the rows come in text, and after that in binary.
+        for i in range(2):
+            await cursor.execute(sql, (95,))
+            self.assertEqual(len(await cursor.fetchmany(3)), 3)
+            ints, floats, bools, stamps, nullable, texts = \
+                await cursor.fetch_columns()
+            self.assertEqual(
+                ints, (array('i', range(4, 96)), array('B', bytes(92))))
+            self.assertEqual(floats[0][-1], 47.5)
+            self.assertEqual(bools[0][:2], array('B', [1, 0]))
+            self.assertEqual(stamps[0][0], 4000000)
+            self.assertEqual(nullable[0][:5], array('i', [40, 50, 60, 0, 80]))
+            self.assertEqual(nullable[1][:5], array('B', [0, 0, 0, 1, 0]))
+            self.assertEqual(texts[0][-1], 'row 95')
+            self.assertEqual(await cursor.fetchall(), ())
+
+        # Without NULLs, every column has a fixed width, so the rows are
+        # copied into the columns a column at a time.
+        sql = "SELECT id, cast(id as int8) * 3, cast(id as float4), true " \
+            "FROM generate_series(1, %s) AS id"
+        await cursor.execute(sql, (95,))
+        await cursor.execute(sql, (95,))
+        ints, longs, floats, bools = await cursor.fetch_columns()
+        self.assertEqual(ints[0], array('i', range(1, 96)))
+        self.assertEqual(longs[0], array('q', range(3, 288, 3)))
+        self.assertEqual(floats[0], array('f', range(1, 96)))
+        self.assertEqual(bools, (array('B', [1] * 95), array('B', bytes(95))))
+
+        # Runs of fixed width columns between other columns, with NULLs here
+        # and there, come out the same in binary as in text.
+        sql = "SELECT id, 'row ' || id, case when id %% 3 = 0 then null " \
+            "else cast(id as int8) end, cast(id as float8) / 4, " \
+            "case when id %% 5 = 0 then null else 'x' end, id %% 2 = 0 " \
+            "FROM generate_series(1, %s) AS id"
+        results = []
+        for i in range(2):
+            await cursor.execute(sql, (95,))
+            results.append(await cursor.fetch_columns())
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1][2][0][:4], array('q', [1, 2, 0, 4]))
+        self.assertEqual(results[1][2][1][:4], array('B', [0, 0, 1, 0]))
+        self.assertEqual(results[1][4][0][3:6], ['x', None, 'x'])
+
+        # Infinite timestamps are the same whether they come in text or in
+        # binary, and whether or not the rows have the same layout.
+        for sql in (
+                "SELECT cast(%s as timestamp) FROM generate_series(1, 20)",
+                "SELECT cast(%s as timestamp), 'x' "
+                "FROM generate_series(1, 20)"):
+            for i in range(2):
+                await cursor.execute(sql, ('infinity',))
+                await cursor.fetchone()
+                stamps = (await cursor.fetch_columns())[0][0]
+                self.assertEqual(stamps, array('q', [2 ** 63 - 1] * 19))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testCopyOutRecords(self):
+        cursor = await self.db.cursor()
+        sql = "SELECT id, 'row ' || id, cast(id as numeric) / 8, " \
+            "date '2000-01-01' + id, case when id %% 7 = 0 then null " \
+            "else id end FROM generate_series(1, 25) AS id"
+        batches = []
+        async for batch in cursor.copy_out_records(sql, 10):
+            batches.append(batch)
+        self.assertEqual([len(b) for b in batches], [10, 10, 5])
+        self.assertEqual(
+            batches[0][6], [
+                7, 'row 7', Decimal('0.87500000000000000000'),
+                datetime.date(2000, 1, 8), None])
+        self.assertEqual(cursor.rowcount, 25)
+        self.assertEqual(cursor.description[0][1], 23)
+
+        # Anything else sent on the connection has to wait until the rest of
+        # the rows have been read.
+        batches = cursor.copy_out_records(sql, 10).__aiter__()
+        self.assertEqual(len(await batches.__anext__()), 10)
+        other = await self.db.cursor()
+        await other.execute("SELECT 1")
+        self.assertEqual(await other.fetchall(), ([1],))
+        self.assertEqual(len(await batches.__anext__()), 10)
+        self.assertEqual(len(await batches.__anext__()), 5)
+
+        try:
+            async for batch in cursor.copy_out_records(
+                    "SELECT cast('08:00:2b:01:02:03' as macaddr)"):
+                pass
+            self.fail("NotSupportedError not raised")
+        except aiopg8000.NotSupportedError:
+            pass
+        await self.db.rollback()
+
+    @async_test
+    async def testCopyOutWithPrefetch(self):
+        # A cursor that prefetches doesn't start a fetch while the rows of
+        # a COPY OUT are still coming in, and the two can be read in turns.
+        cursor = await self.db.cursor()
+        cursor.fetch_size = 10
+        cursor.prefetch = True
+        await cursor.execute("SELECT generate_series(1, %s)", (100,))
+        other = await self.db.cursor()
+        batches = other.copy_out_records(
+            "SELECT generate_series(1, 1000)", 100).__aiter__()
+        copied = list(await batches.__anext__())
+        rows = []
+        async for row in cursor:
+            rows.append(row[0])
+            if row[0] % 20 == 0:
+                copied.extend(await batches.__anext__())
+        self.assertEqual(rows, list(range(1, 101)))
+        async for batch in batches:
+            copied.extend(batch)
+        self.assertEqual(copied, [[i] for i in range(1, 1001)])
+        await cursor.yield_close()
+        await other.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testTpcRecover(self):
+        self.assertEqual(await self.db.tpc_recover(), [])
+        xid = self.db.xid(0, "aiopg8000-test", "")
+        await self.db.tpc_begin(xid)
+        cursor = await self.db.cursor()
+        await cursor.execute("SELECT 1")
+        # Without tpc_prepare() it's a single phase commit.
+        await self.db.tpc_commit()
+        await cursor.yield_close()
+
+    @async_test
+    async def testFetchSizeAutocommit(self):
+        # With a fetch_size of 0 all the rows come back with the execute, so
+        # there's no portal to lose when the transaction ends.
+        self.db.autocommit = True
+        try:
+            cursor = await self.db.cursor()
+            cursor.fetch_size = 0
+            await cursor.execute(
+                "SELECT generate_series(1, %s)", (self.db.fetch_size + 1,))
+            self.assertEqual(
+                len(await cursor.fetchall()), self.db.fetch_size + 1)
+            await cursor.yield_close()
+        finally:
+            self.db.autocommit = False
+
+    @async_test
+    async def testLargeRows(self):
+        # Rows longer than _row_view_size are decoded over a memoryview of
+        # the read buffer, which has to be let go before more is read.
+        cursor = await self.db.cursor()
+        sql = "SELECT id, repeat('x', %s + id), " \
+            "decode(md5(id::text), 'hex'), id::numeric / 4, ARRAY[id, -id], " \
+            "'2001-02-03'::date + id FROM generate_series(1, 300) AS id"
+        for i in range(2):
+            await cursor.execute(sql, (self.db._row_view_size,))
+            rows = await cursor.fetchall()
+            self.assertEqual(len(rows), 300)
+            for row_id, text, digest, quarter, arr, date in rows:
+                self.assertEqual(len(text), self.db._row_view_size + row_id)
+                self.assertIs(type(digest), bytes)
+                self.assertEqual(len(digest), 16)
+                self.assertEqual(quarter, Decimal(row_id) / 4)
+                self.assertEqual(arr, [row_id, -row_id])
+                self.assertEqual(
+                    date,
+                    datetime.date(2001, 2, 3) + datetime.timedelta(row_id))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testLargeRowsUserDecoder(self):
+        # A decoder from outside the driver gets each value as bytes, even
+        # in a row that's decoded over a memoryview of the read buffer.
+        values = []
+
+        def int4_recv(data, offset, length):
+            values.append(data)
+            return int.from_bytes(
+                data[offset:offset + length], 'big', signed=True)
+
+        orig = self.db.pg_types[23]
+        self.db.pg_types[23] = (aiopg8000.core.FC_BINARY, int4_recv)
+        try:
+            cursor = await self.db.cursor()
+            sql = "SELECT id, repeat('y', %s) FROM generate_series(1, 3) id"
+            for i in range(2):
+                await cursor.execute(sql, (self.db._row_view_size,))
+                self.assertEqual(
+                    [row[0] for row in await cursor.fetchall()], [1, 2, 3])
+        finally:
+            self.db.pg_types[23] = orig
+        self.assertEqual(len(values), 3)
+        for data in values:
+            self.assertIs(type(data), bytes)
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testByteaMemoryview(self):
+        self.db.bytea_memoryview = True
+        cursor = await self.db.cursor()
+        for i in range(2):
+            await cursor.execute(
+                "SELECT %s::bytea, NULL::bytea", (b'\x00\xffab',))
+            value, null = (await cursor.fetchall())[0]
+            self.assertIs(type(value), memoryview)
+            self.assertTrue(value.readonly)
+            self.assertEqual(value, b'\x00\xffab')
+            self.assertIsNone(null)
+        self.db.bytea_memoryview = False
+        await cursor.execute("SELECT %s::bytea", (b'ab',))
+        self.assertEqual(await cursor.fetchall(), ([b'ab'],))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testNotificationReceived(self):
+        received = []
+        self.db.NotificationReceived += received.append
+        self.db.autocommit = True
+        cursor = await self.db.cursor()
+        await cursor.execute("LISTEN aiopg8000_test")
+        await cursor.execute("NOTIFY aiopg8000_test")
+        self.assertEqual(len(received), 1)
+        self.assertEqual(self.db.notifies[0][1], 'aiopg8000_test')
+        await cursor.yield_close()
+        self.db.autocommit = False
+
+    @async_test
+    async def testPipelineRoundTrips(self):
+        cursor = await self.db.cursor()
+        await cursor.execute("SELECT 1")
+        p = self.db.pipeline()
+        f1 = p.execute("SELECT cast(%s as int4) + 1", (1,))
+        f2 = p.execute("SELECT cast(%s as int4) + 1", (2,))
+        f3 = p.execute("SELECT 'a', generate_series(1, %s)", (3,))
+        before = self.counter.round_trips
+        await p.sync()
+        self.assertEqual(self.counter.round_trips - before, 1)
+        self.assertEqual((await f1.result().fetchall()), ([2],))
+        self.assertEqual((await f2.result().fetchall()), ([3],))
+        self.assertEqual(
+            (await f3.result().fetchall()),
+            (['a', 1], ['a', 2], ['a', 3]))
+
+        # Now the statements are cached, and the results come back in binary.
+        f1 = p.execute("SELECT cast(%s as int4) + 1", (4,))
+        before = self.counter.round_trips
+        await p.sync()
+        self.assertEqual(self.counter.round_trips - before, 1)
+        self.assertEqual((await f1.result().fetchall()), ([5],))
+        await cursor.yield_close()
+        await self.db.rollback()
+
+    @async_test
+    async def testPipelineError(self):
+        self.db.autocommit = True
+        try:
+            p = self.db.pipeline()
+            f1 = p.execute("SELECT 1")
+            f2 = p.execute("SELECT * FROM t_does_not_exist")
+            f3 = p.execute("SELECT cast(%s as int4)", (3,))
+            await p.sync()
+            self.assertEqual((await f1.result().fetchall()), ([1],))
+            self.assertRaises(aiopg8000.ProgrammingError, f2.result)
+            self.assertEqual((await f3.result().fetchall()), ([3],))
+
+            f4 = p.execute("SELECT 4")
+            p.cancel()
+            self.assertTrue(f4.cancelled())
+        finally:
+            self.db.autocommit = False
+
+
+# The same operations, on a connection driven by an asyncio.Protocol rather
+# than a StreamReader and StreamWriter.
+class TransportTests(unittest.TestCase):
+    @async_test
+    async def setUp(self):
+        kwargs = dict(db_connect)
+        del kwargs['stream_generator']
+        self.db = await aiopg8000.connect(
+            transport_generator=transport_generator, **kwargs)
+
+    @async_test
+    async def tearDown(self):
+        await self.db.yield_close()
+
+    @async_test
+    async def testExecute(self):
+        cursor = await self.db.cursor()
+        for i in range(3):
+            await cursor.execute("SELECT cast(%s as int4) + 1", (i,))
+            self.assertEqual(await cursor.fetchall(), ([i + 1],))
+
+        # Larger than both the read chunk and the row cache.
+        await cursor.execute(
+            "SELECT repeat('x', 100000), generate_series(1, 500)")
+        rows = await cursor.fetchall()
+        self.assertEqual(len(rows), 500)
+        self.assertEqual(rows[-1], ['x' * 100000, 500])
+
+        try:
+            await cursor.execute("SELECT * FROM t_does_not_exist")
+        except aiopg8000.ProgrammingError:
+            pass
+        else:
+            self.fail("expected a ProgrammingError")
+        await self.db.rollback()
+
+    @async_test
+    async def testExecuteMany(self):
+        cursor = await self.db.cursor()
+        await cursor.execute("CREATE TEMPORARY TABLE t1 (f1 int)")
+        await cursor.executemany(
+            "INSERT INTO t1 VALUES (%s)", [(i,) for i in range(2500)])
+        self.assertEqual(cursor.rowcount, 2500)
+        await cursor.execute("SELECT sum(f1) FROM t1")
+        self.assertEqual(await cursor.fetchall(), ([3123750],))
+        await self.db.rollback()
+
+
+if __name__ == "__main__":
+    unittest.main()
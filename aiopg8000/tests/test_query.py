@@ -5,7 +5,6 @@ from .connection_settings import db_connect
 from pg8000.six import u
 from sys import exc_info
 import datetime
-from distutils.version import LooseVersion
 from pg8000.tests.connection_settings import db_connect, async_test
 
 from warnings import filterwarnings
@@ -15,8 +14,8 @@ from warnings import filterwarnings
 # pg8000 custom interface.
 class Tests(unittest.TestCase):
     @async_test
-    def setUp(self):
-        self.db = yield from pg8000.connect(**db_connect)
+    async def setUp(self):
+        self.db = await pg8000.connect(**db_connect)
         filterwarnings("ignore", "DB-API extension cursor.next()")
         filterwarnings("ignore", "DB-API extension cursor.__iter__()")
         self.db.paramstyle = 'format'
@@ -91,7 +90,7 @@ class Tests(unittest.TestCase):
             c1, c2 = self.db.cursor(), self.db.cursor()
             c1count, c2count = 0, 0
             q = "select * from generate_series(1, %s)"
-            params = (self.db._row_cache_size + 1,)
+            params = (self.db.fetch_size + 1,)
             c1.execute(q, params)
             c2.execute(q, params)
             for c2row in c2:
@@ -113,7 +112,7 @@ class Tests(unittest.TestCase):
             cursor = self.db.cursor()
             cursor.execute(
                 "select * from generate_series(1, %s)",
-                (self.db._row_cache_size,))
+                (self.db.fetch_size,))
             for row in cursor:
                 pass
         finally:
@@ -161,7 +160,7 @@ class Tests(unittest.TestCase):
             self.assertEqual("test1", cursor.fetchone()[0])
 
             # Before PostgreSQL 9 we don't know the row count for a select
-            if self.db._server_version > LooseVersion('8.0.0'):
+            if self.db._server_version > (8, 0):
                 self.assertEqual(cursor.rowcount, 1)
 
             # Test with multiple rows...
@@ -201,7 +200,7 @@ class Tests(unittest.TestCase):
 
     def testRowCount(self):
         # Before PostgreSQL 9 we don't know the row count for a select
-        if self.db._server_version > LooseVersion('8.0.0'):
+        if self.db._server_version > (8, 0):
             try:
                 cursor = self.db.cursor()
                 expected_count = 57
@@ -321,7 +320,7 @@ class Tests(unittest.TestCase):
             cursor.execute("select * from t1")
 
             # Before PostgreSQL 9 we don't know the row count for a select
-            if self.db._server_version > LooseVersion('8.0.0'):
+            if self.db._server_version > (8, 0):
                 self.assertEqual(cursor.rowcount, 0)
         finally:
             cursor.close()
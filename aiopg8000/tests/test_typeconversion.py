@@ -8,7 +8,6 @@ from pg8000.six import b, IS_JYTHON, text_type, PY2
 import uuid
 import os
 import time
-from distutils.version import LooseVersion
 import sys
 
 
@@ -640,7 +639,7 @@ class Tests(unittest.TestCase):
 
     def testJsonRoundtrip(self):
         if sys.version_info >= (2, 6) and \
-                self.db._server_version >= LooseVersion('9.2'):
+                self.db._server_version >= (9, 2):
             import json
             val = {'name': 'Apollo 11 Cave', 'zebra': True, 'age': 26.003}
             self.cursor.execute(
@@ -650,7 +649,7 @@ class Tests(unittest.TestCase):
 
     def testJsonbRoundtrip(self):
         if sys.version_info >= (2, 6) and \
-                self.db._server_version >= LooseVersion('9.4'):
+                self.db._server_version >= (9, 4):
             import json
             val = {'name': 'Apollo 11 Cave', 'zebra': True, 'age': 26.003}
             self.cursor.execute(